@@ -0,0 +1,57 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Deferred imports for heavy dependencies (OpenCV, TensorFlow Lite, PyCoral,
+PyAudio), so that importing an aiymakerkit module is fast and a dependency is
+loaded only when something first uses it.
+"""
+
+import importlib
+import threading
+
+_lock = threading.Lock()
+
+
+class LazyModule:
+    """Stands in for a module, and imports it when one of its attributes is
+    first used.
+
+    Args:
+      name (str): The full name of the module, such as
+        ``'pycoral.utils.edgetpu'``.
+    """
+
+    def __init__(self, name):
+        self._lazy_name = name
+        self._lazy_module = None
+
+    def __getattr__(self, attr):
+        module = self._lazy_module
+        if module is None:
+            with _lock:
+                module = importlib.import_module(self._lazy_name)
+            self._lazy_module = module
+        return getattr(module, attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self._lazy_name))
+
+    def __repr__(self):
+        return '<lazy module %r>' % self._lazy_name
+
+
+def load(name):
+    """Returns a :class:`LazyModule` for the named module."""
+    return LazyModule(name)
@@ -26,15 +26,16 @@ import queue
 import sys
 import threading
 
-import pyaudio
-import tflite_runtime.interpreter as tflite
-
-from pycoral.utils import dataset
-from tflite_support import metadata
-
+from . import _lazy
 from . import ring_buffer
 from . import utils
 
+# Heavy dependencies are imported on first use.
+pyaudio = _lazy.load('pyaudio')
+tflite = _lazy.load('tflite_runtime.interpreter')
+dataset = _lazy.load('pycoral.utils.dataset')
+metadata = _lazy.load('tflite_support.metadata')
+
 
 @contextlib.contextmanager
 def pyaudio_stream(*args, **kwargs):
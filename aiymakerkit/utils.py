@@ -18,7 +18,10 @@ Utility functions for use with the vision and audio modules.
 
 import json
 
-from tflite_support import metadata
+from . import _lazy
+
+# Imported on first use, because it's slow to load.
+metadata = _lazy.load('tflite_support.metadata')
 
 
 def _associcated_labels_file(metadata_json):
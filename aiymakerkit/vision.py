@@ -28,18 +28,31 @@ For more info, see https://aiyprojects.withgoogle.com/maker/#reference
 """
 
 import os.path
+import collections
+import concurrent.futures
+import contextlib
 import enum
+import functools
+import glob
+import hashlib
+import multiprocessing
 import platform
-import sys
+import queue
+import threading
+import time
 
-import cv2
 import numpy as np
-import tflite_runtime.interpreter as tflite
 
-from pycoral.adapters import common
-from pycoral.adapters import classify
-from pycoral.adapters import detect
-from pycoral.utils import edgetpu
+from . import _lazy
+
+# Heavy dependencies are imported on first use, so importing this module (and
+# short-lived scripts that don't use every feature) starts quickly.
+cv2 = _lazy.load('cv2')
+tflite = _lazy.load('tflite_runtime.interpreter')
+common = _lazy.load('pycoral.adapters.common')
+classify = _lazy.load('pycoral.adapters.classify')
+detect = _lazy.load('pycoral.adapters.detect')
+edgetpu = _lazy.load('pycoral.utils.edgetpu')
 
 _EDGETPU_SHARED_LIB = {
     'Linux': 'libedgetpu.so.1',
@@ -51,6 +64,14 @@ VIDEO_SIZE = (640, 480)
 CORAL_COLOR = (86, 104, 237)
 BLUE = (255, 0, 0)  # BGR (not RGB)
 
+DETECTION_DTYPE = np.dtype([('id', np.int32), ('score', np.float32),
+                            ('xmin', np.int32), ('ymin', np.int32),
+                            ('xmax', np.int32), ('ymax', np.int32)])
+"""The NumPy structured dtype of the detections returned by
+:func:`Detector.get_objects()` with ``as_array=True``. Each record has the
+fields ``id``, ``score``, ``xmin``, ``ymin``, ``xmax`` and ``ymax``, with the
+box in image pixel coordinates, the same as the |BBox|_ of an |Object|_."""
+
 
 #########################
 ### VISION MODEL APIS ###
@@ -99,35 +120,780 @@ KEYPOINT_EDGES = (
     (KeypointType.RIGHT_KNEE, KeypointType.RIGHT_ANKLE),
 )
 
+# KEYPOINT_EDGES as an index array, to pick all the edges' end points at once.
+_KEYPOINT_EDGE_INDEX = np.array(KEYPOINT_EDGES, dtype=np.intp)
 
-class PoseDetector:
-    """Performs inferencing with a pose detection model such as MoveNet.
+
+def _tensor_quantization(details):
+    """Returns the (scale, zero_point) of a tensor with the given details, or
+    None if the tensor is not quantized."""
+    if np.issubdtype(details['dtype'], np.integer):
+        return details['quantization']
+    return None
+
+
+def _make_interpreter(model, device=None):
+    """Creates an interpreter for the model on an Edge TPU or on the CPU."""
+    if device == 'cpu':
+        return tflite.Interpreter(model_path=model)
+    return edgetpu.make_interpreter(model, device=device)
+
+
+class InterpreterPool:
+    """Loads one model on several devices and shares inferences among them.
+
+    To use the pool, pass it to a vision class in place of the model path,
+    such as ``vision.Detector(pool)``. Each inference then runs on whichever
+    device is idle (in round-robin order when several are idle). To keep all
+    devices busy, run inferences from several threads or use an
+    :class:`InferencePipeline`, which runs one inference per device at once.
 
     Args:
-      model (str): Path to a ``.tflite`` file (compiled for the Edge TPU).
+      model (str): Path to a ``.tflite`` file.
+      devices (list): The devices to load the model on, as strings that
+        identify an Edge TPU (such as ``':0'``, ``'usb:1'`` or ``'pci:0'``),
+        or ``'cpu'`` to use a CPU interpreter (the model must then be one that
+        is not compiled for the Edge TPU). Defaults to every Edge TPU that is
+        connected.
     """
 
-    def __init__(self, model):
-        self.interpreter = edgetpu.make_interpreter(model)
-        self.interpreter.allocate_tensors()
+    def __init__(self, model, devices=None):
+        if devices is None:
+            devices = [':%d' % i for i in range(len(edgetpu.list_edge_tpus()))]
+        if not devices:
+            raise ValueError('No Edge TPU devices found')
+        self.devices = list(devices)
+        self.interpreters = []
+        self._idle = queue.Queue()
+        for device in self.devices:
+            interpreter = _make_interpreter(model, device)
+            interpreter.allocate_tensors()
+            self.interpreters.append(interpreter)
+            self._idle.put(len(self.interpreters) - 1)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self.interpreters)
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """A context manager that waits for an idle interpreter and yields it.
+
+        The interpreter is returned to the pool when the context exits.
+        """
+        index = self._idle.get()
+        start = time.monotonic()
+        try:
+            yield self.interpreters[index]
+        finally:
+            with self._lock:
+                self._busy_times[index] += time.monotonic() - start
+                self._counts[index] += 1
+            self._idle.put(index)
+
+    @property
+    def utilization(self):
+        """A dictionary with the fraction of time (0.0 to 1.0) each device
+        has been busy since the pool was created or :func:`reset_stats()`
+        was called."""
+        with self._lock:
+            elapsed = max(time.monotonic() - self._start_time, 1e-9)
+            return {device: busy / elapsed
+                    for device, busy in zip(self.devices, self._busy_times)}
+
+    @property
+    def inference_counts(self):
+        """A dictionary with the number of inferences run on each device."""
+        with self._lock:
+            return dict(zip(self.devices, self._counts))
+
+    def reset_stats(self):
+        """Resets the utilization and inference counts."""
+        with self._lock:
+            self._start_time = time.monotonic()
+            self._busy_times = [0.0] * len(self.interpreters)
+            self._counts = [0] * len(self.interpreters)
+
+
+_CachedInterpreter = collections.namedtuple(
+    '_CachedInterpreter', ['interpreter', 'lock', 'load_time'])
+
+
+class ModelCache:
+    """A cache of loaded interpreters, shared by all vision class instances.
+
+    Loading a model and allocating its tensors takes time, so the vision
+    classes (such as :class:`Classifier`) get their interpreter from the
+    module's :data:`model_cache` by default. All instances that use the same
+    model file on the same device then share one interpreter, along with a
+    lock that makes sure only one of them runs it at a time.
+
+    Entries are identified by the model's path, a hash of its contents (so a
+    changed file is loaded again) and the device. When the cache is full, the
+    least recently used entry is dropped (instances that already use it
+    keep working).
+
+    Args:
+      max_size (int): The maximum number of interpreters to keep.
+
+    Attributes:
+      hits (int): The number of requests served from the cache.
+      misses (int): The number of requests that loaded a model.
+      evictions (int): The number of entries dropped to make room.
+      load_time (float): The total seconds spent loading models.
+    """
+
+    def __init__(self, max_size=8):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._digests = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_time = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, model, device=None):
+        """Returns a cached interpreter, loading the model if needed.
+
+        Args:
+          model (str): Path to a ``.tflite`` file.
+          device (str): The device, as described for :class:`Classifier`.
+
+        Returns:
+          A tuple (interpreter, lock, load_time), where ``lock`` must be held
+          while using the interpreter and ``load_time`` is the seconds it
+          took to load.
+        """
+        key = (os.path.realpath(model), self._digest(model), device)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        start = time.monotonic()
+        interpreter = _make_interpreter(model, device)
+        interpreter.allocate_tensors()
+        entry = _CachedInterpreter(interpreter, threading.Lock(),
+                                   time.monotonic() - start)
+
+        with self._lock:
+            self.load_time += entry.load_time
+            # Another thread may have loaded the same model in the meantime.
+            if key in self._entries:
+                return self._entries[key]
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        """Drops all cached interpreters."""
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+
+    def _digest(self, model):
+        # Hashing a model takes a while, so only do it when the file changed.
+        info = os.stat(model)
+        stamp = (os.path.realpath(model), info.st_mtime_ns, info.st_size)
+        with self._lock:
+            digest = self._digests.get(stamp)
+        if digest is None:
+            sha = hashlib.sha1()
+            with open(model, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            with self._lock:
+                self._digests[stamp] = digest
+        return digest
+
+
+model_cache = ModelCache()
+"""The :class:`ModelCache` used by the vision classes."""
+
+
+class _InputGeometry(collections.namedtuple(
+        '_InputGeometry', ['x0', 'y0', 'scale_x', 'scale_y', 'width',
+                           'height'])):
+    """Describes where the model input came from in a frame.
+
+    A point in the model input maps to the frame point
+    ``(x0 + x / scale_x, y0 + y / scale_y)``, and ``width`` and ``height``
+    are the frame size.
+    """
+    __slots__ = ()
+
+
+def _resize_input(frame, input_size, out=None):
+    """Resizes a frame to the model input size.
+
+    Args:
+      out: An optional array to write the input data into.
+
+    Returns:
+      A tuple (input_data, None), because the input covers the whole frame.
+    """
+    return cv2.resize(frame, input_size, dst=out, fx=0, fy=0,
+                      interpolation=cv2.INTER_CUBIC), None
+
+
+def _resize_input_keep_aspect(frame, input_size, out=None):
+    """Resizes a frame into the top-left of the model input, keeping its aspect
+    ratio (as pycoral's ``set_resized_input()`` does).
+
+    Args:
+      out: An optional array to write the input data into.
+
+    Returns:
+      A tuple (input_data, geometry).
+    """
+    input_width, input_height = input_size
+    height, width, channels = frame.shape
+    scale = min(input_width / width, input_height / height)
+    w, h = int(width * scale), int(height * scale)
+    if out is None:
+        out = np.zeros((input_height, input_width, channels), dtype=np.uint8)
+    else:
+        out[h:] = 0
+        out[:h, w:] = 0
+    region = out[:h, :w]
+    resized = cv2.resize(frame, (w, h), dst=region, fx=0, fy=0,
+                         interpolation=cv2.INTER_CUBIC)
+    if resized is not region:
+        region[:] = resized
+    return out, _InputGeometry(0, 0, scale, scale, width, height)
+
+
+def _is_roi_list(roi):
+    """Returns whether ``roi`` is a list of regions rather than one region."""
+    return len(roi) == 0 or np.ndim(roi) == 2
+
+
+def _crop_roi(frame, roi):
+    """Returns a tuple (view, x0, y0) with a view of the region
+    (xmin, ymin, xmax, ymax) of the frame (clipped to the frame), without
+    copying, and the region's offset in the frame."""
+    xmin, ymin, xmax, ymax = (int(v) for v in roi)
+    height, width = frame.shape[:2]
+    xmin, xmax = max(0, xmin), min(width, xmax)
+    ymin, ymax = max(0, ymin), min(height, ymax)
+    if xmin >= xmax or ymin >= ymax:
+        raise ValueError('roi %s is outside the frame' % (tuple(roi),))
+    return frame[ymin:ymax, xmin:xmax], xmin, ymin
+
+
+def _roi_geometry(geometry, view, x0, y0, frame, input_size):
+    """Returns the geometry of input made from a view of the frame at
+    (x0, y0), given the geometry relative to the view (or None if the input
+    covers the whole view)."""
+    height, width = frame.shape[:2]
+    if geometry is None:
+        view_height, view_width = view.shape[:2]
+        input_width, input_height = input_size
+        return _InputGeometry(x0, y0, input_width / view_width,
+                              input_height / view_height, width, height)
+    return _InputGeometry(geometry.x0 + x0, geometry.y0 + y0, geometry.scale_x,
+                          geometry.scale_y, width, height)
+
+
+def _load_input(filename, resize, input_size):
+    """Reads an image file and resizes it for the model (in a worker process).
+
+    Returns:
+      A tuple (filename, input_data, geometry), where input_data is None if
+      the file is not a readable image.
+    """
+    frame = cv2.imread(filename)
+    if frame is None:
+        return filename, None, None
+    input_data, geometry = resize(frame, input_size)
+    return filename, input_data, geometry
+
+
+class BatchStats:
+    """Counters collected while running a model on a batch of image files.
 
-    def get_pose(self, frame):
+    Pass an instance as the ``stats`` argument of a batch function (such as
+    :func:`Classifier.get_classes_batch()`) and read it at any time.
+
+    Attributes:
+      images (int): The number of images processed.
+      failed (int): The number of files that could not be read as images.
+      elapsed (float): The seconds since the batch started.
+    """
+
+    def __init__(self):
+        self.images = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    @property
+    def images_per_second(self):
+        """The average number of images processed per second."""
+        return self.images / self.elapsed if self.elapsed else 0.0
+
+
+class Preprocessor:
+    """Converts frames into model input with a single precomputed remap.
+
+    In a deployment, the camera resolution and the model input size don't
+    change, so the pixel mapping for the resize (plus an optional crop and
+    mirror) can be computed once and then applied to each frame with one
+    ``cv2.remap()`` call. Pass a preprocessor to a vision class (such as
+    ``vision.Classifier(model, preprocessor=vision.Preprocessor())``) to use
+    it instead of the default ``cv2.resize()``. The mapping is computed on
+    the first frame and again only if the frame size changes.
+
+    The result is the same as mirroring the frame (if ``mirror`` is True),
+    then cropping it, resizing it, and swapping the color channels. Results
+    from the vision class are reported in the coordinates of the mirrored
+    frame, including the crop offset.
+
+    Args:
+      crop (tuple): An optional region of the frame to use, as an int tuple
+        (xmin, ymin, xmax, ymax). Defaults to the whole frame.
+      mirror (bool): Whether to flip the image horizontally, so you can
+        skip the separate flip in :func:`get_frames()` (``mirror=False``)
+        when you don't display the frames.
+      swap_rb (bool): Whether to swap the red and blue channels, converting
+        OpenCV's BGR frames to the RGB order that most models are trained
+        with.
+      interpolation (str): The sampling quality, one of ``'nearest'``
+        (fastest; the channel swap is folded into the remap), ``'linear'`` or
+        ``'cubic'`` (the channel swap then runs on the small model input).
+    """
+
+    _INTERPOLATIONS = ('nearest', 'linear', 'cubic')
+
+    def __init__(self, crop=None, mirror=False, swap_rb=True,
+                 interpolation='linear'):
+        if interpolation not in self._INTERPOLATIONS:
+            raise ValueError('interpolation must be one of %s' %
+                             (self._INTERPOLATIONS,))
+        self.crop = crop
+        self.mirror = mirror
+        self.swap_rb = swap_rb
+        self.interpolation = interpolation
+        self._maps = {}
+
+    def __call__(self, frame, input_size, keep_aspect=False, out=None):
+        """Converts a frame into model input.
+
+        Args:
+          frame: The bitmap image to convert.
+          input_size (tuple): The model input size, as an int tuple (x,y).
+          keep_aspect (bool): Whether to keep the aspect ratio of the cropped
+            region, filling the rest of the input with zeros (as object
+            detection models expect), rather than stretching it.
+          out: An optional contiguous uint8 array of the input shape to write
+            the input data into (such as the interpreter's input tensor).
+
+        Returns:
+          A tuple (input_data, geometry), where geometry describes the
+          region of the frame that the input came from.
+        """
+        height, width, channels = frame.shape
+        key = (width, height, channels, tuple(input_size), keep_aspect)
+        maps = self._maps.get(key)
+        if maps is None:
+            maps = self._maps[key] = self._make_maps(*key)
+        map1, map2, geometry = maps
+
+        # The maps cover only the part of the input that shows the frame, and
+        # sample it with replicated edges (so the kernel doesn't blend the
+        # edge pixels with black); any padding is filled with zeros.
+        input_width, input_height = input_size
+        h, w = map1.shape[:2]
+        if self.interpolation == 'nearest':
+            w //= channels
+        if out is None:
+            out = np.empty((input_height, input_width, channels), np.uint8)
+        region = out[:h, :w]
+        if self.interpolation == 'nearest':
+            # Remap the frame as a single-channel image, with the map picking
+            # each output channel (which also does the channel swap).
+            cv2.remap(
+                np.ascontiguousarray(frame).reshape(height, width * channels),
+                map1, map2, cv2.INTER_NEAREST,
+                dst=region.reshape(h, w * channels),
+                borderMode=cv2.BORDER_REPLICATE)
+        else:
+            flags = (cv2.INTER_LINEAR if self.interpolation == 'linear' else
+                     cv2.INTER_CUBIC)
+            cv2.remap(frame, map1, map2, flags, dst=region,
+                      borderMode=cv2.BORDER_REPLICATE)
+            if self.swap_rb:
+                cv2.cvtColor(region, cv2.COLOR_BGR2RGB, dst=region)
+        out[h:] = 0
+        out[:h, w:] = 0
+        return out, geometry
+
+    def _make_maps(self, width, height, channels, input_size, keep_aspect):
+        xmin, ymin, xmax, ymax = self.crop or (0, 0, width, height)
+        xmin, xmax = max(0, xmin), min(width, xmax)
+        ymin, ymax = max(0, ymin), min(height, ymax)
+        crop_width, crop_height = xmax - xmin, ymax - ymin
+        if crop_width <= 0 or crop_height <= 0:
+            raise ValueError('crop region is outside the frame')
+
+        input_width, input_height = input_size
+        if keep_aspect:
+            scale_x = scale_y = min(input_width / crop_width,
+                                    input_height / crop_height)
+            w, h = int(crop_width * scale_x), int(crop_height * scale_y)
+        else:
+            scale_x = input_width / crop_width
+            scale_y = input_height / crop_height
+            w, h = input_width, input_height
+
+        # Source coordinates of each output pixel center, for the w x h
+        # part of the input that shows the frame.
+        xs = xmin + (np.arange(w) + 0.5) / scale_x - 0.5
+        ys = ymin + (np.arange(h) + 0.5) / scale_y - 0.5
+        if self.mirror:
+            xs = (width - 1) - xs
+        geometry = _InputGeometry(xmin, ymin, scale_x, scale_y, width, height)
+
+        if self.interpolation == 'nearest':
+            xs = np.clip(np.rint(xs), 0, width - 1)
+            ys = np.clip(np.rint(ys), 0, height - 1)
+            order = np.arange(channels)
+            if self.swap_rb:
+                order = order[::-1]
+            # Each output pixel spans `channels` columns of the flattened rows.
+            xs = (xs[:, None] * channels + order).reshape(-1)
+            map_x = np.tile(xs.astype(np.float32), (h, 1))
+            map_y = np.tile(ys.astype(np.float32)[:, None], (1, w * channels))
+            map1, map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2,
+                                         nninterpolation=True)
+            return map1, map2, geometry
+
+        map_x = np.tile(xs.astype(np.float32), (h, 1))
+        map_y = np.tile(ys.astype(np.float32)[:, None], (1, w))
+        map1, map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+        return map1, map2, geometry
+
+
+class _VisionModel:
+    """Base class that manages the interpreter for the vision model classes.
+
+    Inference is split into three stages so that :class:`InferencePipeline`
+    can overlap the stages of consecutive frames: :func:`_prepare()` turns a
+    frame into model input (on the CPU), :func:`_run()` invokes the model and
+    copies the outputs, and :func:`_finish()` turns the outputs into results
+    (on the CPU). Only :func:`_run()` uses the interpreter.
+
+    Subclasses set ``_resize_function`` to a module-level function that
+    converts a frame into input data and geometry information (so that it
+    can also run in worker processes), and implement :func:`_context()` to
+    combine that geometry with the inference arguments.
+
+    The model may be a path or an :class:`InterpreterPool`. With a pool,
+    ``self.interpreter`` is only used to read the model's input and output
+    details, and :func:`_run()` uses whichever interpreter in the pool is idle.
+    """
+
+    # Whether the input keeps the frame's aspect ratio, as described in
+    # _resize_input_keep_aspect().
+    _keep_aspect = False
+
+    def __init__(self, model, device=None, cache=True, preprocessor=None):
+        self.preprocessor = preprocessor
+        self._pool = None
+        if isinstance(model, InterpreterPool):
+            self._pool = model
+            self.interpreter = model.interpreters[0]
+            self._lock = None
+        elif cache:
+            self.interpreter, self._lock, _ = model_cache.get(model, device)
+        else:
+            self.interpreter = _make_interpreter(model, device)
+            self.interpreter.allocate_tensors()
+            self._lock = threading.Lock()
+        self._output_indices = [
+            d['index'] for d in self.interpreter.get_output_details()]
+
+    @contextlib.contextmanager
+    def _acquire(self):
+        if self._pool:
+            with self._pool.acquire() as interpreter:
+                yield interpreter
+        else:
+            with self._lock:
+                yield self.interpreter
+
+    _resize_function = staticmethod(_resize_input)
+
+    def _infer(self, frame, roi=None, **kwargs):
+        if roi is not None and _is_roi_list(roi):
+            return self._merge_roi_results(
+                [self._infer(frame, r, **kwargs) for r in roi], **kwargs)
+        # Runs the stages back to back without intermediate copies: the input
+        # is written straight into the input tensor, and the results are made
+        # straight from the output tensors (the views must be gone before the
+        # next invoke(), which is why _finish() runs under the lock).
+        with self._acquire() as interpreter:
+            context = self._prepare_into(interpreter, frame, roi, **kwargs)
+            interpreter.invoke()
+            return self._finish(
+                [interpreter.tensor(i)() for i in self._output_indices],
+                context)
+
+    def _infer_files(self, paths, processes=None, stats=None, **kwargs):
+        """Yields a tuple (filename, results) for each image file in the paths.
+
+        Files are read and resized by a pool of worker processes, ahead of
+        the model.
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        files = [f for path in paths for f in _expand_image_paths(path)]
+        if stats is None:
+            stats = BatchStats()
+        load = functools.partial(_load_input, resize=self._resize_function,
+                                 input_size=common.input_size(self.interpreter))
+        start = time.monotonic()
+        with multiprocessing.Pool(processes) as pool:
+            for filename, input_data, geometry in pool.imap(load, files,
+                                                            chunksize=4):
+                if input_data is None:
+                    stats.failed += 1
+                    continue
+                results = self._finish(self._run(input_data),
+                                       self._context(geometry, **kwargs))
+                stats.images += 1
+                stats.elapsed = time.monotonic() - start
+                yield filename, results
+
+    def _prepare(self, frame, roi=None, **kwargs):
+        """Returns a tuple (input_data, context) for the given frame."""
+        input_data, geometry = self._resize(frame, roi=roi)
+        return input_data, self._context(geometry, **kwargs)
+
+    def _prepare_into(self, interpreter, frame, roi=None, **kwargs):
+        """Like :func:`_prepare()`, but writes the input data directly into
+        the interpreter's input tensor and returns only the context."""
+        tensor = common.input_tensor(interpreter)
+        if tensor.dtype != np.uint8 or tensor.shape[-1] != frame.shape[-1]:
+            input_data, geometry = self._resize(frame, roi=roi)
+            tensor[:] = input_data
+        else:
+            input_data, geometry = self._resize(frame, out=tensor, roi=roi)
+            if input_data is not tensor:
+                tensor[:] = input_data
+        return self._context(geometry, **kwargs)
+
+    def _resize(self, frame, out=None, roi=None):
+        input_size = common.input_size(self.interpreter)
+        if roi is not None:
+            if self.preprocessor and (self.preprocessor.crop or
+                                      self.preprocessor.mirror):
+                raise ValueError('roi cannot be used with a preprocessor that '
+                                 'crops or mirrors the frame.')
+            # Resize only the region, from a view of the frame.
+            view, x0, y0 = _crop_roi(frame, roi)
+            input_data, geometry = self._resize(view, out)
+            return input_data, _roi_geometry(geometry, view, x0, y0, frame,
+                                             input_size)
+        if self.preprocessor:
+            return self.preprocessor(frame, input_size, self._keep_aspect, out)
+        return self._resize_function(frame, input_size, out)
+
+    def _merge_roi_results(self, results, **kwargs):
+        """Returns the results for a list of regions, given the results for
+        each one and the inference arguments."""
+        return results
+
+    def _context(self, geometry, **kwargs):
+        """Returns the context that :func:`_finish()` needs for a frame."""
+        raise NotImplementedError
+
+    def _run(self, input_data):
+        """Invokes the model and returns a list of output tensor copies."""
+        with self._acquire() as interpreter:
+            common.set_input(interpreter, input_data)
+            interpreter.invoke()
+            return [interpreter.get_tensor(i) for i in self._output_indices]
+
+    def _finish(self, outputs, context):
+        """Returns the results for the outputs from :func:`_run()`.
+
+        The outputs may be views of the interpreter's tensors, so the results
+        must not refer to them.
+        """
+        raise NotImplementedError
+
+
+# MoveNet's "smart cropping": the minimum score of a keypoint that is used to
+# place the crop region, and the margins around the torso and whole body.
+_CROP_KEYPOINT_THRESHOLD = 0.2
+_CROP_TORSO_MARGIN = 1.9
+_CROP_BODY_MARGIN = 1.2
+_TORSO_KEYPOINTS = [KeypointType.LEFT_SHOULDER, KeypointType.RIGHT_SHOULDER,
+                    KeypointType.LEFT_HIP, KeypointType.RIGHT_HIP]
+
+
+def _initial_crop_region(width, height):
+    """Returns the square crop region (x0, y0, length), in pixels, centered on
+    a frame and covering all of it."""
+    length = max(width, height)
+    return (width - length) / 2, (height - length) / 2, length
+
+
+def _next_crop_region(keypoints, width, height):
+    """Returns the square crop region (x0, y0, length), in pixels, for the
+    frame after the one with the given keypoints.
+
+    This follows MoveNet's "smart cropping": the region is centered on the
+    hips and sized to fit the torso and the visible body with a margin. If
+    the torso isn't visible, the region covers the whole frame.
+    """
+    scores = keypoints[:, 2]
+    torso_visible = (
+        max(scores[KeypointType.LEFT_HIP],
+            scores[KeypointType.RIGHT_HIP]) > _CROP_KEYPOINT_THRESHOLD and
+        max(scores[KeypointType.LEFT_SHOULDER],
+            scores[KeypointType.RIGHT_SHOULDER]) > _CROP_KEYPOINT_THRESHOLD)
+    if not torso_visible:
+        return _initial_crop_region(width, height)
+
+    ys = keypoints[:, 0] * height
+    xs = keypoints[:, 1] * width
+    center_y = (ys[KeypointType.LEFT_HIP] + ys[KeypointType.RIGHT_HIP]) / 2
+    center_x = (xs[KeypointType.LEFT_HIP] + xs[KeypointType.RIGHT_HIP]) / 2
+    torso_range = max(np.abs(ys[_TORSO_KEYPOINTS] - center_y).max(),
+                      np.abs(xs[_TORSO_KEYPOINTS] - center_x).max())
+    visible = scores > _CROP_KEYPOINT_THRESHOLD
+    body_range = max(np.abs(ys[visible] - center_y).max(),
+                     np.abs(xs[visible] - center_x).max())
+    half_length = max(torso_range * _CROP_TORSO_MARGIN,
+                      body_range * _CROP_BODY_MARGIN)
+    half_length = min(half_length, max(center_x, width - center_x,
+                                       center_y, height - center_y))
+    if not 0 < half_length <= max(width, height) / 2:
+        return _initial_crop_region(width, height)
+    return (float(center_x - half_length), float(center_y - half_length),
+            float(half_length * 2))
+
+
+class PoseDetector(_VisionModel):
+    """Performs inferencing with a pose detection model such as MoveNet.
+
+    In tracking mode, the detector feeds the model only the region of the
+    frame where the person is expected to be, based on their pose in the
+    previous frame (MoveNet's "smart cropping"). So a person who is far from
+    the camera fills more of the model input, which gives better poses, and
+    you might be able to use a lower capture resolution. Tracking works best
+    with a continuous stream of frames of one person, passed to
+    :func:`get_pose()`.
+
+    Args:
+      model (str): Path to a ``.tflite`` file (compiled for the Edge TPU), or
+        an :class:`InterpreterPool`.
+      device (str): The Edge TPU to use, such as ``':1'`` or ``'usb:0'``, or
+        ``'cpu'`` for a model that is not compiled for the Edge TPU. Defaults
+        to the first Edge TPU. Ignored if ``model`` is a pool.
+      cache (bool): Whether to share the interpreter with other instances that
+        use the same model on the same device, through :data:`model_cache`.
+        Set False to load a separate interpreter for this instance.
+      preprocessor (Preprocessor): An optional :class:`Preprocessor` to
+        convert frames into model input, instead of a plain resize. (Not used
+        by the batch functions.) Cannot be used with ``tracking``.
+      tracking (bool): Whether to crop each frame around the person found in
+        the previous frame.
+    """
+
+    def __init__(self, model, device=None, cache=True, preprocessor=None,
+                 tracking=False):
+        if tracking and preprocessor:
+            raise ValueError('A preprocessor cannot be used with tracking.')
+        super().__init__(model, device, cache, preprocessor)
+        self.tracking = tracking
+        self._crop_region = None
+
+    @property
+    def crop_region(self):
+        """The region of the frame that tracking mode will pass to the model
+        next, as a tuple (xmin, ymin, xmax, ymax) in pixels, or None before
+        the first frame. The region may extend beyond the frame."""
+        if self._crop_region is None:
+            return None
+        _, (x0, y0, length) = self._crop_region
+        return (int(x0), int(y0), int(x0 + length), int(y0 + length))
+
+    def reset_tracking(self):
+        """Forgets the tracked person, so the next frame is passed to the model
+        in whole, such as after a scene change."""
+        self._crop_region = None
+
+    def get_pose(self, frame, out=None):
         """
         Gets the keypoint pose data for one person.
 
         Args:
           frame: The bitmap image to pass through the model.
+          out: An optional float32 array in shape [17, 3] to write the results
+            into, so that no new array is allocated for each frame.
 
         Returns:
           The COCO-style keypoint results, reshaped to [17, 3], in which each
-          keypoint has [y, x, score].
+          keypoint has [y, x, score]. This is ``out`` if given.
         """
-        resized_img = cv2.resize(frame, common.input_size(self.interpreter),
-                                 fx=0, fy=0, interpolation=cv2.INTER_CUBIC)
-        common.set_input(self.interpreter, resized_img)
-        self.interpreter.invoke()
-        return common.output_tensor(self.interpreter, 0).copy().reshape(
-            len(KeypointType), 3)
+        return self._infer(frame, out=out)
+
+    def _resize(self, frame, out=None, roi=None):
+        if not self.tracking:
+            return super()._resize(frame, out, roi)
+        height, width = frame.shape[:2]
+        if self._crop_region and self._crop_region[0] == (width, height):
+            x0, y0, length = self._crop_region[1]
+        else:
+            x0, y0, length = _initial_crop_region(width, height)
+        # Crop and resize at once; parts of the region beyond the frame are
+        # filled with zeros.
+        input_width, input_height = common.input_size(self.interpreter)
+        scale_x, scale_y = input_width / length, input_height / length
+        matrix = np.array([[scale_x, 0, -x0 * scale_x],
+                           [0, scale_y, -y0 * scale_y]])
+        input_data = cv2.warpAffine(frame, matrix, (input_width, input_height),
+                                    dst=out, flags=cv2.INTER_LINEAR,
+                                    borderMode=cv2.BORDER_CONSTANT,
+                                    borderValue=0)
+        return input_data, _InputGeometry(x0, y0, scale_x, scale_y, width,
+                                          height)
+
+    def _context(self, geometry, out=None):
+        return geometry, out
+
+    def _finish(self, outputs, context):
+        geometry, out = context
+        keypoints = outputs[0].reshape(len(KeypointType), 3)
+        if out is None:
+            keypoints = keypoints.copy()
+        else:
+            np.copyto(out, keypoints)
+            keypoints = out
+        if geometry:
+            # Map from the input region to the whole frame (still normalized).
+            input_width, input_height = common.input_size(self.interpreter)
+            keypoints[:, 0] = (geometry.y0 + keypoints[:, 0] * input_height /
+                               geometry.scale_y) / geometry.height
+            keypoints[:, 1] = (geometry.x0 + keypoints[:, 1] * input_width /
+                               geometry.scale_x) / geometry.width
+            if self.tracking:
+                size = (geometry.width, geometry.height)
+                self._crop_region = size, _next_crop_region(keypoints, *size)
+        return keypoints
 
 
 class PoseClassifier:
@@ -141,6 +907,14 @@ class PoseClassifier:
     def __init__(self, model):
         self.interpreter = tflite.Interpreter(model_path=model)
         self.interpreter.allocate_tensors()
+        input_details = self.interpreter.get_input_details()[0]
+        output_details = self.interpreter.get_output_details()[0]
+        self._input_index = input_details['index']
+        self._input_dtype = input_details['dtype']
+        self._input_quantization = _tensor_quantization(input_details)
+        self._output_index = output_details['index']
+        self._output_quantization = _tensor_quantization(output_details)
+        self._batch_size = int(input_details['shape'][0])
 
     def get_class(self, keypoints, threshold=0.01):
         """
@@ -153,16 +927,65 @@ class PoseClassifier:
             classification.
 
         Returns:
-          The class id for the top result.
+          The class id for the top result, or None if its score is below the
+          threshold.
+        """
+        scores = self._get_scores(np.reshape(keypoints, (1, -1)))[0]
+        class_id = np.argmax(scores)
+        if scores[class_id] < threshold:
+            return None
+        return class_id
+
+    def get_classes(self, keypoints, threshold=0.01):
+        """
+        Gets the top pose classification results for many poses at once, such
+        as the poses of several people, or a recorded sequence of poses.
+
+        All the poses are passed through the model in one batch.
+
+        Args:
+          keypoints: A stack of COCO-style pose keypoints, in shape
+            [N, 17, 3] for N poses.
+          threshold (float): The minimum confidence score for a
+            classification.
+
+        Returns:
+          A tuple (ids, scores) of arrays with the class id and score of the
+          top result for each pose. The id is -1 where the score is below the
+          threshold.
         """
-        # Reshape input for classify model
-        keypoints = keypoints.flatten().reshape(1, 51)
-        input_index = self.interpreter.get_input_details()[0]["index"]
-        output_index = self.interpreter.get_output_details()[0]["index"]
-        self.interpreter.set_tensor(input_index, keypoints)
+        keypoints = np.asarray(keypoints)
+        if not len(keypoints):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self._get_scores(keypoints.reshape(len(keypoints), -1))
+        ids = np.argmax(scores, axis=1)
+        top_scores = np.take_along_axis(scores, ids[:, np.newaxis], 1)[:, 0]
+        ids[top_scores < threshold] = -1
+        return ids, top_scores
+
+    def _get_scores(self, inputs):
+        """Returns the model's scores for a batch of flattened keypoints."""
+        count = len(inputs)
+        if count != self._batch_size:
+            # Resize the input for the batch (tensors are reallocated only
+            # when the batch size changes).
+            self.interpreter.resize_tensor_input(self._input_index,
+                                                 [count, inputs.shape[1]])
+            self.interpreter.allocate_tensors()
+            self._batch_size = count
+        if self._input_quantization:
+            scale, zero_point = self._input_quantization
+            limits = np.iinfo(self._input_dtype)
+            inputs = np.clip(np.round(inputs / scale + zero_point),
+                             limits.min, limits.max)
+        self.interpreter.set_tensor(self._input_index,
+                                    inputs.astype(self._input_dtype))
         self.interpreter.invoke()
-        output = self.interpreter.tensor(output_index)
-        return np.argmax(output()[0])
+        scores = self.interpreter.get_tensor(self._output_index)
+        if self._output_quantization:
+            scale, zero_point = self._output_quantization
+            scores = scale * (scores.astype(np.int64) - zero_point)
+        return scores
 
 
 def get_keypoint_types(frame, keypoints, threshold=0.01):
@@ -191,68 +1014,1360 @@ def get_keypoint_types(frame, keypoints, threshold=0.01):
     return points
 
 
-class Detector:
-    """Performs inferencing with an object detection model.
+def get_keypoint_array(frame, keypoints, threshold=0.01):
+    """Converts keypoint data into an array of locations scaled for the image
+    size.
+
+    This is the same conversion as :func:`get_keypoint_types()`, but it's done
+    with array operations, for one pose or many at once.
 
     Args:
-      model (str): Path to a ``.tflite`` file (compiled for the Edge TPU).
-        Must be an SSD model.
+      frame: The original image used for pose detection.
+      keypoints: A COCO-style keypoints tensor in shape [17, 3], such as
+        returned by :func:`PoseDetector.get_pose()`, or a stack of them in
+        shape [N, 17, 3] for N poses.
+      threshold (float): The minimum confidence score for valid keypoints.
+
+    Returns:
+      A tuple (points, valid). ``points`` is an int32 array in shape [17, 2]
+      (or [N, 17, 2]) with the (x,y) location of each keypoint, indexed by
+      :obj:`KeypointType`. ``valid`` is a bool array in shape [17] (or
+      [N, 17]) that is True for each keypoint detected above the threshold.
     """
+    keypoints = np.asarray(keypoints)
+    height, width, _ = frame.shape
+    points = (keypoints[..., 1::-1] * (width, height)).astype(np.int32)
+    return points, keypoints[..., 2] > threshold
 
-    def __init__(self, model):
-        self.interpreter = edgetpu.make_interpreter(model)
-        self.interpreter.allocate_tensors()
 
-    def get_objects(self, frame, threshold=0.01):
+class Detector(_VisionModel):
+    """Performs inferencing with an object detection model.
+
+    The model must be an SSD model.
+
+    Args:
+      model (str): Path to a ``.tflite`` file (compiled for the Edge TPU), or
+        an :class:`InterpreterPool`.
+      device (str): The Edge TPU to use, such as ``':1'`` or ``'usb:0'``, or
+        ``'cpu'`` for a model that is not compiled for the Edge TPU. Defaults
+        to the first Edge TPU. Ignored if ``model`` is a pool.
+      cache (bool): Whether to share the interpreter with other instances that
+        use the same model on the same device, through :data:`model_cache`.
+        Set False to load a separate interpreter for this instance.
+      preprocessor (Preprocessor): An optional :class:`Preprocessor` to
+        convert frames into model input, instead of a plain resize. (Not used
+        by the batch functions.)
+    """
+
+    def __init__(self, model, device=None, cache=True, preprocessor=None):
+        super().__init__(model, device, cache, preprocessor)
+        self._output_indices = self._detection_output_indices()
+
+    def _detection_output_indices(self):
+        """Returns the output tensor indices for (boxes, class ids, scores,
+        count), the same way as ``pycoral.adapters.detect.get_objects()``."""
+        signature_list = self.interpreter._get_full_signature_list()
+        if signature_list:
+            if len(signature_list) > 1:
+                raise ValueError('Only support model with one signature.')
+            outputs = signature_list[next(iter(signature_list))]['outputs']
+            return [outputs['output_3'], outputs['output_2'],
+                    outputs['output_1'], outputs['output_0']]
+        if len(self._output_indices) != 4:
+            raise ValueError('Output tensor count must be 4 for a detection '
+                             'model without a signature.')
+        output_details = self.interpreter.get_output_details()
+        if np.prod(output_details[3]['shape']) == 1:
+            # Outputs are (boxes, class ids, scores, count).
+            return self._output_indices
+        # Outputs are (scores, boxes, count, class ids).
+        scores, boxes, count, class_ids = self._output_indices
+        return [boxes, class_ids, scores, count]
+
+    def get_objects(self, frame, threshold=0.01, as_array=False, roi=None):
         """
         Gets a list of objects detected in the given image frame.
 
         Args:
           frame: The bitmap image to pass through the model.
           threshold (float): The minimum confidence score for returned results.
+          as_array (bool): Whether to return the objects as a NumPy structured
+            array of :data:`DETECTION_DTYPE`, instead of a list. The array is
+            made with vectorized operations, which is faster when there are
+            many results, and keeps further processing vectorized.
+          roi: An optional region of interest, as an int tuple
+            (xmin, ymin, xmax, ymax) or |BBox|_, to pass through the model
+            instead of the whole frame. Objects are then bigger in the model
+            input, and the resize is cheaper. Or a list of regions, each of
+            which is passed through the model; the objects from all regions
+            are returned together. Either way, the bounding boxes are in
+            frame coordinates. This can't be used with a :class:`Preprocessor`
+            that sets ``crop`` or ``mirror``.
 
         Returns:
           A list of |Object|_ objects, each of which contains a detected
-          object's id, score, and bounding box as |BBox|_.
+          object's id, score, and bounding box as |BBox|_. Or, if
+          ``as_array`` is True, an array of :data:`DETECTION_DTYPE` with one
+          record per object, in the same order.
         """
-        height, width, _ = frame.shape
-        _, scale = common.set_resized_input(self.interpreter, (width, height),
-                                            lambda size: cv2.resize(frame, size,
-                                                                    fx=0, fy=0,
-                                                                    interpolation=cv2.INTER_CUBIC))
-        self.interpreter.invoke()
-        return detect.get_objects(self.interpreter, threshold, scale)
+        return self._infer(frame, threshold=threshold, as_array=as_array,
+                           roi=roi)
+
+    _resize_function = staticmethod(_resize_input_keep_aspect)
+    _keep_aspect = True
 
+    def get_objects_batch(self, paths, threshold=0.01, processes=None,
+                          stats=None, as_array=False):
+        """
+        Detects objects in many image files, such as archived captures.
 
-class Classifier:
+        Files are decoded and resized by a pool of worker processes, so the
+        model doesn't wait for Python to decode the images.
+
+        Args:
+          paths: A directory, glob pattern or image file path, or a list of
+            them.
+          threshold (float): The minimum confidence score for returned results.
+          processes (int): The number of worker processes. Defaults to the
+            number of CPUs.
+          stats (BatchStats): An optional :class:`BatchStats` to update.
+          as_array (bool): Whether to yield the objects as arrays of
+            :data:`DETECTION_DTYPE`, as :func:`get_objects()` does.
+
+        Returns:
+          An iterator that yields a tuple (filename, objects) for each image,
+          where objects is the same as returned by :func:`get_objects()`.
+          Files that are not readable images are skipped.
+        """
+        return self._infer_files(paths, processes, stats, threshold=threshold,
+                                 as_array=as_array)
+
+    def _context(self, geometry, threshold=0.01, as_array=False):
+        return geometry, threshold, as_array
+
+    def _merge_roi_results(self, results, as_array=False, **kwargs):
+        if as_array:
+            return np.concatenate(results or [np.zeros(0, DETECTION_DTYPE)])
+        return [obj for objects in results for obj in objects]
+
+    def _finish(self, outputs, context):
+        geometry, threshold, as_array = context
+        boxes, class_ids, scores, count = (output[0] for output in outputs)
+        input_width, input_height = common.input_size(self.interpreter)
+        sx = input_width / geometry.scale_x
+        sy = input_height / geometry.scale_y
+
+        if as_array:
+            count = int(count)
+            keep = np.flatnonzero(scores[:count] >= threshold)
+            # Boxes are [ymin, xmin, ymax, xmax], relative to the input size.
+            kept = boxes[keep].astype(np.float64)
+            kept *= (sy, sx, sy, sx)
+            kept += (geometry.y0, geometry.x0, geometry.y0, geometry.x0)
+            objects = np.empty(len(keep), dtype=DETECTION_DTYPE)
+            objects['id'] = class_ids[keep]
+            objects['score'] = scores[keep]
+            objects['ymin'], objects['xmin'], objects['ymax'], \
+                objects['xmax'] = kept.T
+            return objects
+
+        def make(i):
+            ymin, xmin, ymax, xmax = boxes[i]
+            bbox = detect.BBox(xmin=xmin, ymin=ymin, xmax=xmax,
+                               ymax=ymax).scale(sx, sy)
+            if geometry.x0 or geometry.y0:
+                bbox = bbox.translate(geometry.x0, geometry.y0)
+            return detect.Object(id=int(class_ids[i]), score=float(scores[i]),
+                                 bbox=bbox.map(int))
+
+        return [make(i) for i in range(int(count)) if scores[i] >= threshold]
+
+
+class Classifier(_VisionModel):
     """Performs inferencing with an image classification model.
 
     Args:
-      model (str): Path to a ``.tflite`` file (compiled for the Edge TPU).
+      model (str): Path to a ``.tflite`` file (compiled for the Edge TPU), or
+        an :class:`InterpreterPool`.
+      device (str): The Edge TPU to use, such as ``':1'`` or ``'usb:0'``, or
+        ``'cpu'`` for a model that is not compiled for the Edge TPU. Defaults
+        to the first Edge TPU. Ignored if ``model`` is a pool.
+      cache (bool): Whether to share the interpreter with other instances that
+        use the same model on the same device, through :data:`model_cache`.
+        Set False to load a separate interpreter for this instance.
+      preprocessor (Preprocessor): An optional :class:`Preprocessor` to
+        convert frames into model input, instead of a plain resize. (Not used
+        by the batch functions.)
     """
 
-    def __init__(self, model):
-        self.interpreter = edgetpu.make_interpreter(model)
-        self.interpreter.allocate_tensors()
+    def __init__(self, model, device=None, cache=True, preprocessor=None):
+        super().__init__(model, device, cache, preprocessor)
+        self._quantization = _tensor_quantization(
+            self.interpreter.get_output_details()[0])
 
-    def get_classes(self, frame, top_k=1, threshold=0.0):
+    @property
+    def quantization(self):
+        """The (scale, zero_point) of the model's quantized scores, or None if
+        the scores are floats. A raw score ``q`` is the probability
+        ``scale * (q - zero_point)``."""
+        return self._quantization
+
+    def get_classes(self, frame, top_k=1, threshold=0.0, as_array=False,
+                    raw_out=None, roi=None):
         """
         Gets classification results as a list of ordered classes.
 
+        Only the ``top_k`` best scores are found (without sorting all of them)
+        and converted from the model's quantized values, so a small ``top_k``
+        is faster with models that have many classes.
+
         Args:
           frame: The bitmap image to pass through the model.
           top_k (int): The number of top results to return.
           threshold (float): The minimum confidence score for returned results.
+          as_array (bool): Whether to return the results as a tuple of arrays
+            (ids, scores), instead of a list of |Class|_ objects.
+          raw_out: An optional array, in the size of the model output and of
+            its data type (usually uint8), to receive the raw scores of all
+            classes, such as for averaging them over time. It is filled in
+            place, so the same array can be reused for every frame. Use
+            :attr:`quantization` to convert the raw scores.
+          roi: An optional region of interest, as an int tuple
+            (xmin, ymin, xmax, ymax) or |BBox|_, to classify instead of the
+            whole frame. Or a list of regions to classify separately (not
+            with ``raw_out``). This can't be used with a
+            :class:`Preprocessor` that sets ``crop`` or ``mirror``.
 
         Returns:
           A list of |Class|_ objects representing the classification results,
-          ordered by scores.
+          ordered by scores. Or, if ``as_array`` is True, a tuple
+          (ids, scores) of arrays in the same order. If ``roi`` is a list,
+          a list with the results for each region.
         """
-        size = common.input_size(self.interpreter)
-        common.set_input(self.interpreter, cv2.resize(frame, size, fx=0, fy=0,
-                                                      interpolation=cv2.INTER_CUBIC))
-        self.interpreter.invoke()
-        return classify.get_classes(self.interpreter, top_k, threshold)
+        if raw_out is not None and roi is not None and _is_roi_list(roi):
+            raise ValueError('raw_out cannot be used with a list of regions.')
+        return self._infer(frame, top_k=top_k, threshold=threshold,
+                           as_array=as_array, raw_out=raw_out, roi=roi)
+
+    def get_classes_batch(self, paths, top_k=1, threshold=0.0, processes=None,
+                          stats=None):
+        """
+        Classifies many image files, such as archived captures.
+
+        Files are decoded and resized by a pool of worker processes, so the
+        model doesn't wait for Python to decode the images.
+
+        Args:
+          paths: A directory, glob pattern or image file path, or a list of
+            them.
+          top_k (int): The number of top results to return for each image.
+          threshold (float): The minimum confidence score for returned results.
+          processes (int): The number of worker processes. Defaults to the
+            number of CPUs.
+          stats (BatchStats): An optional :class:`BatchStats` to update.
+
+        Returns:
+          An iterator that yields a tuple (filename, classes) for each image,
+          where classes is the same as returned by :func:`get_classes()`.
+          Files that are not readable images are skipped.
+        """
+        return self._infer_files(paths, processes, stats, top_k=top_k,
+                                 threshold=threshold)
+
+    def _context(self, geometry, top_k=1, threshold=0.0, as_array=False,
+                 raw_out=None):
+        return top_k, threshold, as_array, raw_out
+
+    def _finish(self, outputs, context):
+        top_k, threshold, as_array, raw_out = context
+        raw_scores = outputs[0].reshape(-1)
+        if raw_out is not None:
+            np.copyto(raw_out, raw_scores)
+        # The quantization is monotonic, so the top raw scores are the top
+        # scores, and only those need to be dequantized.
+        top_k = int(min(top_k, raw_scores.size))
+        ids = np.argpartition(raw_scores, -top_k)[-top_k:]
+        ids = ids[np.argsort(raw_scores[ids], kind='stable')[::-1]]
+        scores = raw_scores[ids]
+        if self._quantization:
+            scale, zero_point = self._quantization
+            scores = scale * (scores.astype(np.int64) - zero_point)
+        keep = scores >= threshold
+        ids, scores = ids[keep], scores[keep]
+        if as_array:
+            return ids, scores
+        return [classify.Class(i, score) for i, score in zip(ids, scores)]
+
+
+class InferencePipeline:
+    """Runs a vision model on a stream of frames, overlapping the work for
+    consecutive frames.
+
+    Each inference has three stages: preparing the input (resizing the frame),
+    running the model, and processing the output into results. A pipeline
+    runs each stage on its own thread, so while the Edge TPU runs the model
+    for one frame, the CPU can prepare the next frame and process the results
+    of the previous one. If the model uses an :class:`InterpreterPool`, the
+    pipeline runs the model on all of the pool's devices at once.
+
+    Call :func:`submit()` with each frame to get a
+    ``concurrent.futures.Future`` for its results. Results are always
+    produced in the order that frames were submitted. For example::
+
+        detector = vision.Detector(models.OBJECT_DETECTION_MODEL)
+        with vision.InferencePipeline(detector) as pipeline:
+            pending = collections.deque()
+            for frame in vision.get_frames():
+                pending.append((frame, pipeline.submit(frame, threshold=0.5)))
+                if len(pending) == pipeline.depth:
+                    old_frame, future = pending.popleft()
+                    objects = future.result()
+
+    Args:
+      model: A :class:`Detector`, :class:`Classifier` or :class:`PoseDetector`.
+      depth (int): The maximum number of frames in the pipeline at once.
+        :func:`submit()` blocks while this many frames are unfinished.
+      workers (int): The number of threads that run the model. Defaults to the
+        number of devices in the model's :class:`InterpreterPool`, or 1.
+    """
+
+    STAGES = ('prepare', 'run', 'finish')
+
+    def __init__(self, model, depth=3, workers=None):
+        if depth < 1:
+            raise ValueError('depth must be at least 1')
+        if workers is None:
+            workers = len(model._pool) if model._pool else 1
+        self.model = model
+        self.depth = depth
+        self.workers = workers
+        self._slots = threading.Semaphore(depth)
+        self._submit_lock = threading.Lock()
+        self._next_seq = 0
+        self._prepare_queue = queue.Queue()
+        self._run_queue = queue.Queue()
+        self._finish_queue = queue.Queue()
+        self._stage_lock = threading.Lock()
+        self._stage_times = {stage: 0.0 for stage in self.STAGES}
+        self._stage_counts = {stage: 0 for stage in self.STAGES}
+        self._threads = [threading.Thread(target=self._prepare_worker),
+                         threading.Thread(target=self._finish_worker)]
+        self._threads += [threading.Thread(target=self._run_worker)
+                          for _ in range(workers)]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, frame, **kwargs):
+        """Queues a frame for inference.
+
+        Args:
+          frame: The bitmap image to pass through the model. Don't modify it
+            until its result is ready.
+          **kwargs: Arguments for the model's inference function, such as
+            ``threshold`` for :func:`Detector.get_objects()`. The ``roi``
+            argument can only be a single region.
+
+        Returns:
+          A ``concurrent.futures.Future`` whose result is the same as what the
+          model's inference function (such as :func:`Detector.get_objects()`)
+          returns for the frame.
+
+        Raises:
+          ValueError: If ``roi`` is a list of regions.
+        """
+        roi = kwargs.get('roi')
+        if roi is not None and _is_roi_list(roi):
+            raise ValueError('InferencePipeline accepts only a single roi; '
+                             'submit the frame once for each region')
+        self._slots.acquire()
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._submit_lock:
+            self._prepare_queue.put((self._next_seq, future, frame, kwargs))
+            self._next_seq += 1
+        return future
+
+    def close(self):
+        """Finishes all submitted frames and stops the pipeline threads."""
+        self._prepare_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    @property
+    def timings(self):
+        """A dictionary with the average seconds per frame spent in each stage
+        (``'prepare'``, ``'run'`` and ``'finish'``)."""
+        with self._stage_lock:
+            return {stage: total / max(self._stage_counts[stage], 1)
+                    for stage, total in self._stage_times.items()}
+
+    def _timed(self, stage, function, *args, **kwargs):
+        start = time.monotonic()
+        result = function(*args, **kwargs)
+        with self._stage_lock:
+            self._stage_times[stage] += time.monotonic() - start
+            self._stage_counts[stage] += 1
+        return result
+
+    def _prepare_worker(self):
+        while True:
+            item = self._prepare_queue.get()
+            if item is None:
+                for _ in range(self.workers):
+                    self._run_queue.put(None)
+                return
+            seq, future, frame, kwargs = item
+            data = context = None
+            try:
+                data, context = self._timed('prepare', self.model._prepare,
+                                            frame, **kwargs)
+            except Exception as e:
+                future.set_exception(e)
+            self._run_queue.put((seq, future, data, context))
+
+    def _run_worker(self):
+        while True:
+            item = self._run_queue.get()
+            if item is None:
+                self._finish_queue.put(None)
+                return
+            seq, future, data, context = item
+            if not future.done():
+                try:
+                    data = self._timed('run', self.model._run, data)
+                except Exception as e:
+                    future.set_exception(e)
+            self._finish_queue.put((seq, future, data, context))
+
+    def _finish_worker(self):
+        # With several run workers, frames can arrive out of order.
+        pending = {}
+        next_seq = 0
+        running = self.workers
+        while running:
+            item = self._finish_queue.get()
+            if item is None:
+                running -= 1
+                continue
+            pending[item[0]] = item
+            while next_seq in pending:
+                _, future, data, context = pending.pop(next_seq)
+                next_seq += 1
+                if future.done():
+                    continue
+                try:
+                    future.set_result(self._timed('finish', self.model._finish,
+                                                  data, context))
+                except Exception as e:
+                    future.set_exception(e)
+
+
+TrackedObject = collections.namedtuple('TrackedObject',
+                                       ['track_id', 'id', 'score', 'bbox'])
+TrackedObject.__doc__ = """An object followed by :class:`ObjectTracker`.
+
+It has the same ``id``, ``score`` and ``bbox`` fields as an |Object|_, so you
+can pass it to functions such as :func:`draw_objects()`.
+
+Attributes:
+  track_id (int): A number that stays the same for the object from frame to
+    frame, unique within the tracker.
+  id (int): The object's class id, from its latest detection.
+  score (float): The object's score, from its latest detection.
+  bbox (BBox): The object's tracked location, as a |BBox|_.
+"""
+
+
+def _box_iou(boxes_a, boxes_b):
+    """Returns the matrix of IoU (intersection over union) between two arrays
+    of [xmin, ymin, xmax, ymax] boxes."""
+    a = boxes_a[:, np.newaxis]
+    b = boxes_b[np.newaxis]
+    width = np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0])
+    height = np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1])
+    intersection = np.clip(width, 0, None) * np.clip(height, 0, None)
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection),
+                     where=union > 0)
+
+
+def _detection_arrays(objects):
+    """Returns (boxes, ids, scores) arrays for a list of |Object|_ or an array
+    of :data:`DETECTION_DTYPE`."""
+    if isinstance(objects, np.ndarray):
+        boxes = np.stack([objects['xmin'], objects['ymin'], objects['xmax'],
+                          objects['ymax']], axis=1).astype(np.float64)
+        return boxes, objects['id'].astype(np.int64), objects['score']
+    boxes = np.array([tuple(obj.bbox) for obj in objects],
+                     dtype=np.float64).reshape(-1, 4)
+    ids = np.array([obj.id for obj in objects], dtype=np.int64)
+    scores = np.array([obj.score for obj in objects], dtype=np.float32)
+    return boxes, ids, scores
+
+
+# The constant-velocity Kalman filter from SORT, on the state
+# [center x, center y, area, aspect ratio, and the velocities of the first 3].
+_KALMAN_F = np.eye(7)
+_KALMAN_F[0, 4] = _KALMAN_F[1, 5] = _KALMAN_F[2, 6] = 1
+_KALMAN_H = np.eye(4, 7)
+_KALMAN_R = np.diag([1.0, 1.0, 10.0, 10.0])
+_KALMAN_Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+_KALMAN_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 10000.0, 10000.0, 10000.0])
+
+
+def _boxes_to_states(boxes):
+    width = boxes[:, 2] - boxes[:, 0]
+    height = boxes[:, 3] - boxes[:, 1]
+    return np.stack([boxes[:, 0] + width / 2, boxes[:, 1] + height / 2,
+                     width * height, width / np.maximum(height, 1e-6)], axis=1)
+
+
+def _states_to_boxes(states):
+    width = np.sqrt(np.clip(states[:, 2] * states[:, 3], 0, None))
+    height = states[:, 2] / np.maximum(width, 1e-6)
+    return np.stack([states[:, 0] - width / 2, states[:, 1] - height / 2,
+                     states[:, 0] + width / 2, states[:, 1] + height / 2],
+                    axis=1)
+
+
+class ObjectTracker:
+    """Follows detected objects from frame to frame, giving each one a
+    ``track_id`` that stays the same while it's in view.
+
+    This is a SORT-style tracker: each object's box is predicted by a Kalman
+    filter with constant velocity, and new detections are matched to the
+    predicted boxes by their overlap (IoU). Because the tracker can predict
+    where objects are, it can also fill in the frames where you don't run the
+    detector, which multiplies the frame rate on a slow host. For example, to
+    detect objects in every third frame::
+
+        detector = vision.Detector(models.OBJECT_DETECTION_MODEL)
+        tracker = vision.ObjectTracker(detector, detect_every=3,
+                                       threshold=0.5)
+        for frame in vision.get_frames():
+            objects = tracker.get_objects(frame)
+            vision.draw_objects(frame, objects, labels)
+
+    You can instead run the detector yourself and pass its results to
+    :func:`update()`, and call :func:`predict()` for frames without results.
+
+    Args:
+      detector (Detector): The :class:`Detector` to use in
+        :func:`get_objects()`. Not needed if you use :func:`update()`.
+      detect_every (int): How often :func:`get_objects()` runs the detector:
+        1 runs it for every frame, 2 for every second frame, and so on.
+      threshold (float): The minimum confidence score for detections passed
+        to the tracker from :func:`get_objects()`.
+      iou_threshold (float): The minimum IoU between a detection and a
+        predicted box for them to be matched.
+      max_age (int): The number of consecutive detections that can miss an
+        object before it's dropped.
+      min_hits (int): The number of times an object must be detected before
+        it's reported.
+      roi: An optional region of interest (or list of regions) for the
+        detector in :func:`get_objects()`, as described in
+        :func:`Detector.get_objects()`.
+    """
+
+    def __init__(self, detector=None, detect_every=1, threshold=0.5,
+                 iou_threshold=0.3, max_age=1, min_hits=1, roi=None):
+        if detect_every < 1:
+            raise ValueError('detect_every must be at least 1.')
+        self.detector = detector
+        self.detect_every = detect_every
+        self.threshold = threshold
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.roi = roi
+        self._frame_count = 0
+        self._next_track_id = 1
+        self.reset()
+
+    def reset(self):
+        """Forgets all tracked objects."""
+        self._states = np.zeros((0, 7))
+        self._covariances = np.zeros((0, 7, 7))
+        self._track_ids = np.zeros(0, dtype=np.int64)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._scores = np.zeros(0, dtype=np.float32)
+        self._hits = np.zeros(0, dtype=np.int64)
+        self._misses = np.zeros(0, dtype=np.int64)
+
+    def get_objects(self, frame):
+        """
+        Gets the tracked objects in the next frame, running the detector only
+        on every ``detect_every`` frames.
+
+        Args:
+          frame: The bitmap image to pass through the model (when it runs).
+
+        Returns:
+          A list of :obj:`TrackedObject`.
+        """
+        if self.detector is None:
+            raise ValueError(
+                'ObjectTracker needs a detector for get_objects().')
+        detect = self._frame_count % self.detect_every == 0
+        self._frame_count += 1
+        if detect:
+            return self.update(self.detector.get_objects(
+                frame, threshold=self.threshold, as_array=True, roi=self.roi))
+        return self.predict()
+
+    def update(self, objects):
+        """
+        Advances the tracker by one frame with new detections.
+
+        Args:
+          objects: The objects detected in the frame, as a list of |Object|_
+            or as an array of :data:`DETECTION_DTYPE`, such as returned by
+            :func:`Detector.get_objects()`.
+
+        Returns:
+          A list of :obj:`TrackedObject` for the objects that are detected in
+          this frame.
+        """
+        self._predict()
+        boxes, ids, scores = _detection_arrays(objects)
+
+        # Match detections to the predicted boxes of the same class, greedily
+        # from the highest IoU.
+        iou = _box_iou(_states_to_boxes(self._states), boxes)
+        iou[self._ids[:, np.newaxis] != ids[np.newaxis]] = 0
+        tracks, detections = np.nonzero(iou >= self.iou_threshold)
+        order = np.argsort(-iou[tracks, detections], kind='stable')
+        matched_tracks, matched_detections = [], []
+        used_tracks, used_detections = set(), set()
+        for t, d in zip(tracks[order].tolist(), detections[order].tolist()):
+            if t not in used_tracks and d not in used_detections:
+                used_tracks.add(t)
+                used_detections.add(d)
+                matched_tracks.append(t)
+                matched_detections.append(d)
+
+        if matched_tracks:
+            self._correct(matched_tracks, boxes[matched_detections])
+            self._ids[matched_tracks] = ids[matched_detections]
+            self._scores[matched_tracks] = scores[matched_detections]
+            self._hits[matched_tracks] += 1
+        self._misses += 1
+        self._misses[matched_tracks] = 0
+
+        keep = self._misses <= self.max_age
+        if not keep.all():
+            self._select(keep)
+
+        new = np.setdiff1d(np.arange(len(boxes)), matched_detections)
+        if len(new):
+            self._add(boxes[new], ids[new], scores[new])
+        return self._report()
+
+    def predict(self):
+        """
+        Advances the tracker by one frame without detections, such as a frame
+        that you don't pass through the detector.
+
+        Returns:
+          A list of :obj:`TrackedObject` for the objects that were detected in
+          the latest :func:`update()`, at their predicted locations.
+        """
+        self._predict()
+        return self._report()
+
+    def _predict(self):
+        states = self._states
+        # Don't let the predicted area become negative.
+        shrinking = states[:, 2] + states[:, 6] <= 0
+        states[shrinking, 6] = 0
+        self._states = states @ _KALMAN_F.T
+        self._covariances = (_KALMAN_F @ self._covariances @ _KALMAN_F.T +
+                             _KALMAN_Q)
+
+    def _correct(self, tracks, boxes):
+        states = self._states[tracks]
+        covariances = self._covariances[tracks]
+        residuals = _boxes_to_states(boxes) - states @ _KALMAN_H.T
+        pht = covariances @ _KALMAN_H.T
+        gains = pht @ np.linalg.inv(_KALMAN_H @ pht + _KALMAN_R)
+        self._states[tracks] = states + (gains @ residuals[..., np.newaxis])[
+            ..., 0]
+        self._covariances[tracks] = (np.eye(7) - gains @ _KALMAN_H) @ \
+            covariances
+
+    def _add(self, boxes, ids, scores):
+        count = len(boxes)
+        states = np.zeros((count, 7))
+        states[:, :4] = _boxes_to_states(boxes)
+        self._states = np.concatenate([self._states, states])
+        self._covariances = np.concatenate(
+            [self._covariances, np.broadcast_to(_KALMAN_P0, (count, 7, 7))])
+        track_ids = np.arange(self._next_track_id, self._next_track_id + count)
+        self._next_track_id += count
+        self._track_ids = np.concatenate([self._track_ids, track_ids])
+        self._ids = np.concatenate([self._ids, ids])
+        self._scores = np.concatenate([self._scores, scores])
+        self._hits = np.concatenate([self._hits, np.ones(count, np.int64)])
+        self._misses = np.concatenate([self._misses,
+                                       np.zeros(count, np.int64)])
+
+    def _select(self, tracks):
+        self._states = self._states[tracks]
+        self._covariances = self._covariances[tracks]
+        self._track_ids = self._track_ids[tracks]
+        self._ids = self._ids[tracks]
+        self._scores = self._scores[tracks]
+        self._hits = self._hits[tracks]
+        self._misses = self._misses[tracks]
+
+    def _report(self):
+        reported = np.flatnonzero((self._misses == 0) &
+                                  (self._hits >= self.min_hits))
+        boxes = _states_to_boxes(self._states[reported]).astype(int)
+        # Skip boxes that a prediction has shrunk to nothing.
+        valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+        return [TrackedObject(track_id=int(self._track_ids[i]),
+                              id=int(self._ids[i]),
+                              score=float(self._scores[i]),
+                              bbox=detect.BBox(*box))
+                for i, box in zip(reported[valid].tolist(),
+                                  boxes[valid].tolist())]
+
+
+def _nms(boxes, scores, ids, iou_threshold):
+    """Returns the indices of the boxes that non-maximum suppression keeps,
+    from the highest score. Boxes overlap only with boxes of the same id."""
+    if not len(boxes):
+        return np.zeros(0, dtype=np.intp)
+    # Shift each class into its own area, so classes never overlap.
+    offset = boxes.max() - boxes.min() + 1
+    boxes = boxes + (ids * offset)[:, np.newaxis]
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        iou = _box_iou(boxes[best:best + 1], boxes[order[1:]])[0]
+        order = order[1:][iou <= iou_threshold]
+    return np.array(keep, dtype=np.intp)
+
+
+class TiledDetector:
+    """Detects small objects in a large frame by passing overlapping tiles of
+    the frame through a :class:`Detector`, instead of the whole frame.
+
+    A detection model's input is small (such as 300x300), so in a large frame
+    (such as 1920x1080) distant objects shrink to a few pixels. With tiles,
+    each part of the frame gets the model's full resolution. The objects from
+    all tiles are merged, in frame coordinates, with non-maximum suppression
+    (NMS), which removes the duplicates found in the overlapping areas.
+
+    If the detector uses an :class:`InterpreterPool`, tiles run on all of the
+    pool's Edge TPUs in parallel. Otherwise they run one after another.
+
+    Args:
+      detector (Detector): The detector to run on each tile. Its
+        :class:`Preprocessor`, if any, must not set ``crop`` or ``mirror``.
+      grid (tuple): The number of tiles across and down the frame, as (x,y).
+      overlap (float): The fraction of each tile that overlaps the next one,
+        so objects on a tile edge are whole in some tile.
+      iou_threshold (float): The minimum IoU (intersection over union) for
+        two objects of the same class to be merged by NMS.
+      full_frame (bool): Whether to also detect objects in the whole frame,
+        to find objects that are too large for one tile.
+
+    Attributes:
+      tile_times (list): The seconds spent on each tile for the latest frame,
+        in the order of :func:`get_tiles()` (then the full frame, if used).
+      merge_time (float): The seconds spent merging the latest frame's
+        results.
+    """
+
+    def __init__(self, detector, grid=(2, 2), overlap=0.2, iou_threshold=0.5,
+                 full_frame=False):
+        if grid[0] < 1 or grid[1] < 1:
+            raise ValueError('grid must have at least one tile each way.')
+        if not 0 <= overlap < 1:
+            raise ValueError('overlap must be at least 0 and less than 1.')
+        if detector.preprocessor and (detector.preprocessor.crop or
+                                      detector.preprocessor.mirror):
+            raise ValueError('The detector\'s preprocessor cannot crop or '
+                             'mirror the frame, because tiles are regions of '
+                             'interest.')
+        self.detector = detector
+        self.grid = tuple(grid)
+        self.overlap = overlap
+        self.iou_threshold = iou_threshold
+        self.full_frame = full_frame
+        self.tile_times = []
+        self.merge_time = 0.0
+        workers = len(detector._pool) if detector._pool else 1
+        self._executor = None
+        if workers > 1:
+            self._executor = concurrent.futures.ThreadPoolExecutor(workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stops the threads that run tiles in parallel."""
+        if self._executor:
+            self._executor.shutdown()
+
+    def get_tiles(self, size):
+        """
+        Gets the tiles for a frame size.
+
+        Args:
+          size (tuple): The frame size, as (x,y).
+
+        Returns:
+          A list of (xmin, ymin, xmax, ymax) tuples, row by row.
+        """
+        def spans(length, count):
+            tile = length / (count - (count - 1) * self.overlap)
+            step = tile * (1 - self.overlap)
+            return [(int(round(i * step)), min(length, int(round(i * step +
+                                                                 tile))))
+                    for i in range(count)]
+
+        width, height = size
+        return [(xmin, ymin, xmax, ymax)
+                for ymin, ymax in spans(height, self.grid[1])
+                for xmin, xmax in spans(width, self.grid[0])]
+
+    def get_objects(self, frame, threshold=0.01, as_array=False):
+        """
+        Gets a list of objects detected in the given image frame, tile by
+        tile.
+
+        Args:
+          frame: The bitmap image to pass through the model.
+          threshold (float): The minimum confidence score for returned results.
+          as_array (bool): Whether to return the objects as an array of
+            :data:`DETECTION_DTYPE`, instead of a list.
+
+        Returns:
+          A list of |Object|_ objects (or an array, if ``as_array`` is True),
+          the same as returned by :func:`Detector.get_objects()`, ordered by
+          score.
+        """
+        height, width = frame.shape[:2]
+        regions = self.get_tiles((width, height))
+        if self.full_frame:
+            regions.append((0, 0, width, height))
+
+        def detect_region(region):
+            start = time.monotonic()
+            objects = self.detector.get_objects(frame, threshold=threshold,
+                                                as_array=True, roi=region)
+            return objects, time.monotonic() - start
+
+        if self._executor:
+            results = list(self._executor.map(detect_region, regions))
+        else:
+            results = [detect_region(region) for region in regions]
+        self.tile_times = [elapsed for _, elapsed in results]
+
+        start = time.monotonic()
+        objects = np.concatenate([objects for objects, _ in results])
+        boxes = np.stack([objects['xmin'], objects['ymin'], objects['xmax'],
+                          objects['ymax']], axis=1).astype(np.float64)
+        objects = objects[_nms(boxes, objects['score'],
+                               objects['id'].astype(np.int64),
+                               self.iou_threshold)]
+        self.merge_time = time.monotonic() - start
+        if as_array:
+            return objects
+        return [detect.Object(id=obj_id, score=score,
+                              bbox=detect.BBox(xmin, ymin, xmax, ymax))
+                for obj_id, score, xmin, ymin, xmax, ymax in objects.tolist()]
+
+
+ZoneMeasures = collections.namedtuple(
+    'ZoneMeasures',
+    ['object_overlap', 'zone_overlap', 'contained', 'centroid_inside'])
+ZoneMeasures.__doc__ = """How objects relate to the zones of a
+:class:`ZoneMonitor`.
+
+Each attribute is an array in shape [N, Z] for N objects and Z zones.
+
+Attributes:
+  object_overlap: The fraction of each object's box that is inside each zone.
+  zone_overlap: The fraction of each zone that is covered by each object's
+    box.
+  contained: True where an object's box is entirely inside a zone.
+  centroid_inside: True where the center of an object's box is inside a zone.
+"""
+
+ZoneEvent = collections.namedtuple('ZoneEvent', ['kind', 'zone', 'track_id'])
+ZoneEvent.__doc__ = """An object entering or leaving a zone of a
+:class:`ZoneMonitor`.
+
+Attributes:
+  kind (str): Either ``'enter'`` or ``'exit'``.
+  zone: The zone's name (or its index, if the zones were given as a list).
+  track_id (int): The track id of the object.
+"""
+
+
+class ZoneMonitor:
+    """Checks which zones of the frame detected objects are in, for many
+    objects and many zones at once.
+
+    Zones are rectangles or polygons. Their geometry is prepared once, so
+    that each frame's objects are measured against all zones with array
+    operations: the overlap between each object and each zone (rectangles
+    exactly, polygons with a precomputed mask), whether each object is
+    entirely inside each zone, and whether its center is.
+
+    With tracked objects (from :class:`ObjectTracker`), :func:`update()` also
+    reports when objects enter and leave zones::
+
+        zones = vision.ZoneMonitor({'door': (0, 0, 200, 480),
+                                    'desk': [(300, 200), (600, 250),
+                                             (550, 480), (250, 480)]})
+        for frame in vision.get_frames():
+            for event in zones.update(tracker.get_objects(frame)):
+                print('Object %d: %s %s' % (event.track_id, event.kind,
+                                            event.zone))
+
+    Args:
+      zones: A dictionary that maps zone names to zones, or a list of zones.
+        Each zone is a rectangle, as an (xmin, ymin, xmax, ymax) tuple or
+        |BBox|_, or a polygon, as a list of at least 3 (x,y) points.
+      size (tuple): The frame size, as (x,y).
+      membership (str): How :func:`update()` decides that an object is in a
+        zone: ``'centroid'`` if the center of its box is in the zone,
+        ``'contained'`` if its whole box is, or ``'overlap'`` if enough of its
+        box is (see ``min_overlap`` and ``min_coverage``).
+      min_overlap (float): With ``'overlap'``, the fraction of an object's box
+        that must be in a zone.
+      min_coverage (float): With ``'overlap'``, an optional fraction of a zone
+        that an object can cover to be in the zone even if less than
+        ``min_overlap`` of the object is in it (such as a person close to the
+        camera).
+      exit_delay (int): The number of updates that a tracked object can be
+        missing before it is reported to exit its zones.
+      mask_scale (float): The resolution of the polygon masks, relative to the
+        frame size. Lower is faster but less precise.
+
+    Attributes:
+      names (list): The zone names, in the order of the measure arrays.
+      measures (ZoneMeasures): The measures from the latest :func:`update()`.
+      inside: The membership from the latest :func:`update()`, as a bool
+        array in shape [N, Z] for N objects and Z zones.
+    """
+
+    _MEMBERSHIPS = ('centroid', 'contained', 'overlap')
+
+    def __init__(self, zones, size=VIDEO_SIZE, membership='centroid',
+                 min_overlap=0.5, min_coverage=None, exit_delay=0,
+                 mask_scale=0.25):
+        if membership not in self._MEMBERSHIPS:
+            raise ValueError('membership must be one of %s' %
+                             (self._MEMBERSHIPS,))
+        if isinstance(zones, dict):
+            self.names, shapes = list(zones.keys()), list(zones.values())
+        else:
+            shapes = list(zones)
+            self.names = list(range(len(shapes)))
+        self.size = tuple(size)
+        self.membership = membership
+        self.min_overlap = min_overlap
+        self.min_coverage = min_coverage
+        self.exit_delay = exit_delay
+        self.mask_scale = mask_scale
+        self.measures = None
+        self.inside = np.zeros((0, len(self.names)), dtype=bool)
+        self._tracks = {}
+
+        rects, polygons, self._outlines = [], [], []
+        self._rect_zones, self._polygon_zones = [], []
+        for i, (name, shape) in enumerate(zip(self.names, shapes)):
+            points = np.asarray(shape, dtype=np.float64)
+            if points.shape == (4,):
+                xmin, ymin, xmax, ymax = points
+                rects.append(points)
+                self._rect_zones.append(i)
+                outline = [(xmin, ymin), (xmax, ymin), (xmax, ymax),
+                           (xmin, ymax)]
+            elif points.ndim == 2 and points.shape[1] == 2 and len(points) >= 3:
+                polygons.append(points)
+                self._polygon_zones.append(i)
+                outline = points
+            else:
+                raise ValueError('Zone %r must be an (xmin, ymin, xmax, ymax) '
+                                 'rectangle or at least 3 (x,y) points.' %
+                                 (name,))
+            self._outlines.append(np.round(outline).astype(np.int32))
+
+        self._rects = np.array(rects, dtype=np.float64).reshape(-1, 4)
+        self._rect_areas = ((self._rects[:, 2] - self._rects[:, 0]) *
+                            (self._rects[:, 3] - self._rects[:, 1]))
+
+        # Polygon masks as integral images, so the area of any box in a mask
+        # is 4 lookups.
+        width, height = self.size
+        self._mask_size = (max(1, int(round(width * mask_scale))),
+                           max(1, int(round(height * mask_scale))))
+        mask_width, mask_height = self._mask_size
+        integrals = []
+        for polygon in polygons:
+            mask = np.zeros((mask_height, mask_width), dtype=np.uint8)
+            cv2.fillPoly(mask, [np.round(polygon * mask_scale).astype(
+                np.int32)], 1)
+            integrals.append(cv2.integral(mask))
+        self._integrals = np.array(integrals, dtype=np.int64).reshape(
+            len(polygons), mask_height + 1, mask_width + 1)
+
+        # Polygon edges for the point-in-polygon test, with a one-hot matrix
+        # of which polygon each edge belongs to.
+        if polygons:
+            self._edge_starts = np.concatenate(polygons)
+            self._edge_ends = np.concatenate(
+                [np.roll(polygon, -1, axis=0) for polygon in polygons])
+            owners = np.repeat(np.arange(len(polygons)),
+                               [len(polygon) for polygon in polygons])
+        else:
+            self._edge_starts = self._edge_ends = np.zeros((0, 2))
+            owners = np.zeros(0, dtype=np.intp)
+        self._edge_owners = np.eye(len(polygons), dtype=np.int64)[owners]
+
+    def measure(self, objects):
+        """
+        Measures how objects relate to all zones.
+
+        Args:
+          objects: A list of |Object|_ (or :obj:`TrackedObject`), or an array
+            of :data:`DETECTION_DTYPE`.
+
+        Returns:
+          A :obj:`ZoneMeasures`.
+        """
+        boxes, _, _ = _detection_arrays(objects)
+        count, zones = len(boxes), len(self.names)
+        object_overlap = np.zeros((count, zones))
+        zone_overlap = np.zeros((count, zones))
+        contained = np.zeros((count, zones), dtype=bool)
+        centroid_inside = np.zeros((count, zones), dtype=bool)
+        xmin, ymin, xmax, ymax = (boxes[:, i:i + 1] for i in range(4))
+        center_x, center_y = (xmin + xmax) / 2, (ymin + ymax) / 2
+
+        if len(self._rects):
+            rx0, ry0, rx1, ry1 = self._rects.T
+            intersection = (
+                np.clip(np.minimum(xmax, rx1) - np.maximum(xmin, rx0), 0,
+                        None) *
+                np.clip(np.minimum(ymax, ry1) - np.maximum(ymin, ry0), 0,
+                        None))
+            areas = (xmax - xmin) * (ymax - ymin)
+            object_overlap[:, self._rect_zones] = np.divide(
+                intersection, areas, out=np.zeros_like(intersection),
+                where=areas > 0)
+            zone_overlap[:, self._rect_zones] = np.divide(
+                intersection, self._rect_areas,
+                out=np.zeros_like(intersection), where=self._rect_areas > 0)
+            contained[:, self._rect_zones] = ((xmin >= rx0) & (ymin >= ry0) &
+                                              (xmax <= rx1) & (ymax <= ry1))
+            centroid_inside[:, self._rect_zones] = (
+                (center_x >= rx0) & (center_x < rx1) &
+                (center_y >= ry0) & (center_y < ry1))
+
+        if len(self._integrals):
+            # Overlaps from the integral images, in mask pixels.
+            mask_width, mask_height = self._mask_size
+            scaled = np.round(boxes * self.mask_scale).astype(np.intp)
+            x0, x1 = (np.clip(scaled[:, i], 0, mask_width) for i in (0, 2))
+            y0, y1 = (np.clip(scaled[:, i], 0, mask_height) for i in (1, 3))
+            table = self._integrals
+            intersection = (table[:, y1, x1] - table[:, y0, x1] -
+                            table[:, y1, x0] + table[:, y0, x0]).T
+            areas = ((x1 - x0) * (y1 - y0))[:, np.newaxis]
+            zone_areas = table[:, -1, -1]
+            object_overlap[:, self._polygon_zones] = np.divide(
+                intersection, areas, out=np.zeros(intersection.shape),
+                where=areas > 0)
+            zone_overlap[:, self._polygon_zones] = np.divide(
+                intersection, zone_areas, out=np.zeros(intersection.shape),
+                where=zone_areas > 0)
+            contained[:, self._polygon_zones] = (areas > 0) & (
+                intersection >= areas)
+
+            # Even-odd rule: a point is inside if a ray from it crosses an odd
+            # number of edges.
+            sx, sy = self._edge_starts.T
+            ex, ey = self._edge_ends.T
+            straddles = (sy > center_y) != (ey > center_y)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                crossing_x = sx + (center_y - sy) * (ex - sx) / (ey - sy)
+            crossings = (straddles & (center_x < crossing_x)).astype(np.int64)
+            centroid_inside[:, self._polygon_zones] = (
+                crossings @ self._edge_owners) % 2 == 1
+
+        return ZoneMeasures(object_overlap, zone_overlap, contained,
+                            centroid_inside)
+
+    def update(self, objects, track_ids=None):
+        """
+        Measures the tracked objects in a frame against all zones, and reports
+        which objects entered or left which zones since the previous update.
+
+        Args:
+          objects: A list of :obj:`TrackedObject`, such as returned by
+            :func:`ObjectTracker.get_objects()`, or other objects as
+            accepted by :func:`measure()` along with ``track_ids``.
+          track_ids: The track id of each object, if the objects don't have a
+            ``track_id``.
+
+        Returns:
+          A list of :obj:`ZoneEvent`.
+        """
+        if track_ids is None:
+            try:
+                track_ids = [obj.track_id for obj in objects]
+            except AttributeError:
+                raise ValueError('update() needs tracked objects, or the '
+                                 'track_ids of the objects.') from None
+        self.measures = self.measure(objects)
+        if self.membership == 'centroid':
+            inside = self.measures.centroid_inside
+        elif self.membership == 'contained':
+            inside = self.measures.contained
+        else:
+            inside = self.measures.object_overlap >= self.min_overlap
+            if self.min_coverage is not None:
+                inside |= self.measures.zone_overlap >= self.min_coverage
+        self.inside = inside
+
+        zones = len(self.names)
+        was_inside = np.array(
+            [self._tracks[t][0] if t in self._tracks else np.zeros(zones, bool)
+             for t in track_ids], dtype=bool).reshape(-1, zones)
+        events = []
+        for kind, changes in (('exit', was_inside & ~inside),
+                              ('enter', inside & ~was_inside)):
+            for i, zone in zip(*np.nonzero(changes)):
+                events.append(ZoneEvent(kind, self.names[zone], track_ids[i]))
+
+        # Objects that are missing leave their zones after exit_delay updates.
+        tracks = {t: (row, 0) for t, row in zip(track_ids, inside)}
+        for track_id, (row, missing) in self._tracks.items():
+            if track_id in tracks:
+                continue
+            if missing < self.exit_delay:
+                tracks[track_id] = (row, missing + 1)
+            else:
+                events.extend(ZoneEvent('exit', self.names[zone], track_id)
+                              for zone in np.flatnonzero(row))
+        self._tracks = tracks
+        return events
+
+    def draw(self, frame, color=BLUE, thickness=3):
+        """
+        Draws the outlines of all zones.
+
+        Args:
+          frame: The bitmap image to draw upon.
+          color (tuple): The BGR color (int,int,int) for the outlines.
+          thickness (int): The outline pixel thickness.
+        """
+        cv2.polylines(frame, self._outlines, True, color, thickness)
+
+
+class MotionDetector:
+    """Detects changes between frames, so you can skip inferencing while
+    nothing moves.
+
+    Each frame is shrunk to a small grayscale image and compared with a
+    background image, which is a running average of past frames (so slow
+    changes such as daylight are absorbed). If enough of the watched pixels
+    differ, the frame has motion. :func:`run()` also compares each frame with
+    the frame of its previous result, so it notices when something leaves.
+    This costs much less than running a model, so gating the model with
+    :func:`run()` cuts the Edge TPU and CPU load for a mostly static scene,
+    such as a security camera at night::
+
+        motion = vision.MotionDetector()
+        for frame in vision.get_frames():
+            objects = motion.run(frame, detector.get_objects, threshold=0.5)
+
+    Args:
+      size (tuple): The size of the images that are compared, as (x,y).
+        Smaller is faster but less sensitive to small objects.
+      threshold (int): The minimum brightness difference (0-255) for a pixel
+        to count as changed. Lower is more sensitive.
+      min_area (float): The minimum fraction of the watched pixels that must
+        change for the frame to have motion. Lower is more sensitive.
+      mask: The regions of the frame to watch, as a list of (xmin, ymin,
+        xmax, ymax) rectangles (or |BBox|_) in frame pixels, or as an image
+        in which nonzero pixels are watched. Defaults to the whole frame.
+      learning_rate (float): How quickly the background adapts to changes,
+        from 0 (never) to 1 (only the previous frame is compared).
+      refresh_every (int): With :func:`run()`, the maximum number of
+        consecutive frames to skip, even without motion. None never forces a
+        refresh.
+
+    Attributes:
+      frames (int): The number of frames passed to :func:`run()`.
+      skipped (int): The number of those frames for which the function was not
+        called.
+      motion_ratio (float): The fraction of watched pixels that changed in the
+        latest frame.
+      motion_mask: The changed pixels in the latest frame, as a uint8 image
+        of ``size`` (255 where changed).
+    """
+
+    def __init__(self, size=(160, 120), threshold=25, min_area=0.005,
+                 mask=None, learning_rate=0.05, refresh_every=None):
+        if not 0 <= learning_rate <= 1:
+            raise ValueError('learning_rate must be between 0 and 1.')
+        self.size = tuple(size)
+        self.threshold = threshold
+        self.min_area = min_area
+        self.mask = mask
+        self.learning_rate = learning_rate
+        self.refresh_every = refresh_every
+        self.frames = 0
+        self.skipped = 0
+        self.motion_ratio = 0.0
+        self.motion_mask = None
+        self._background = None
+        self._frame_shape = None
+        self._watched = None
+        self._small = None
+        self._reference = None
+        self._result = None
+        self._has_result = False
+        self._idle = 0
+
+    @property
+    def skip_ratio(self):
+        """The fraction of frames passed to :func:`run()` that were skipped."""
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def reset(self):
+        """Forgets the background and the last result, so the next frame is
+        treated as changed."""
+        self._background = None
+        self._reference = None
+        self._result = None
+        self._has_result = False
+        self._idle = 0
+
+    def detect(self, frame):
+        """
+        Checks whether a frame has changed from the background, and updates
+        the background.
+
+        Args:
+          frame: The bitmap image to check.
+
+        Returns:
+          True if the frame has motion. The first frame always does.
+        """
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        self._small = small
+
+        if self._background is None or frame.shape != self._frame_shape:
+            self._frame_shape = frame.shape
+            self._reference = None
+            self._watched = self._make_watched(frame.shape)
+            self._background = small.astype(np.float32)
+            self.motion_mask = np.zeros_like(small)
+            self.motion_ratio = 1.0
+            return True
+
+        self.motion_mask, self.motion_ratio = self._compare(
+            small, cv2.convertScaleAbs(self._background))
+        cv2.accumulateWeighted(small, self._background, self.learning_rate)
+        return self.motion_ratio >= self.min_area
+
+    def _compare(self, small, reference):
+        """Returns (mask, ratio) of the watched pixels that differ between two
+        shrunk frames."""
+        difference = cv2.absdiff(small, reference)
+        _, mask = cv2.threshold(difference, self.threshold, 255,
+                                cv2.THRESH_BINARY)
+        if self._watched is not None:
+            cv2.bitwise_and(mask, self._watched, dst=mask)
+            watched = self._watched_count
+        else:
+            watched = mask.size
+        return mask, cv2.countNonZero(mask) / watched if watched else 0.0
+
+    def run(self, frame, function, *args, **kwargs):
+        """
+        Calls a function with the frame if it has motion, and otherwise
+        returns the function's previous result.
+
+        Args:
+          frame: The bitmap image to check, passed as the first argument to
+            ``function``.
+          function: The function to gate, such as
+            :func:`Detector.get_objects()`.
+          *args: More arguments for ``function``.
+          **kwargs: Keyword arguments for ``function``.
+
+        Returns:
+          The result of ``function``, either new or from the latest frame for
+          which it was called.
+        """
+        self.frames += 1
+        motion = self.detect(frame)
+        if not motion and self._reference is not None:
+            # Also compare with the frame of the previous result, which the
+            # background may not show yet (such as when something leaves).
+            _, ratio = self._compare(self._small, self._reference)
+            motion = ratio >= self.min_area
+        stale = (self.refresh_every is not None and
+                 self._idle >= self.refresh_every)
+        if motion or stale or not self._has_result:
+            self._result = function(frame, *args, **kwargs)
+            self._has_result = True
+            self._reference = self._small
+            self._idle = 0
+        else:
+            self.skipped += 1
+            self._idle += 1
+        return self._result
+
+    def _make_watched(self, frame_shape):
+        """Returns the mask of watched pixels at the comparison size, or None
+        to watch them all."""
+        if self.mask is None:
+            return None
+        width, height = self.size
+        if isinstance(self.mask, np.ndarray):
+            watched = cv2.resize((self.mask != 0).astype(np.uint8) * 255,
+                                 self.size, interpolation=cv2.INTER_NEAREST)
+        else:
+            frame_height, frame_width = frame_shape[:2]
+            sx, sy = width / frame_width, height / frame_height
+            watched = np.zeros((height, width), dtype=np.uint8)
+            for xmin, ymin, xmax, ymax in self.mask:
+                watched[int(ymin * sy):int(np.ceil(ymax * sy)),
+                        int(xmin * sx):int(np.ceil(xmax * sx))] = 255
+        if watched.ndim == 3:
+            watched = watched[..., 0]
+        self._watched_count = cv2.countNonZero(watched)
+        return watched
 
 
 #############################
@@ -283,19 +2398,23 @@ def draw_objects(frame, objs, labels=None, color=CORAL_COLOR, thickness=5):
     Args:
       frame: The bitmap image to draw upon.
       objs: A list of |Object|_ objects for which you want to draw bounding
-        boxes on the frame.
+        boxes on the frame, or an array of :data:`DETECTION_DTYPE`.
       labels (str): The labels file corresponding to the model used for object
         detection.
       color (tuple): The BGR color (int,int,int) to use for the bounding box.
       thickness (int): The bounding box pixel thickness.
     """
-    for obj in objs:
-        bbox = obj.bbox
-        cv2.rectangle(frame, (bbox.xmin, bbox.ymin), (bbox.xmax, bbox.ymax),
-                      color, thickness)
+    if isinstance(objs, np.ndarray):
+        objs = zip(objs['id'].tolist(), objs['xmin'].tolist(),
+                   objs['ymin'].tolist(), objs['xmax'].tolist(),
+                   objs['ymax'].tolist())
+    else:
+        objs = ((obj.id, *obj.bbox) for obj in objs)
+    for obj_id, xmin, ymin, xmax, ymax in objs:
+        cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), color, thickness)
         if labels:
-            cv2.putText(frame, labels.get(obj.id),
-                        (bbox.xmin + thickness, bbox.ymax - thickness),
+            cv2.putText(frame, labels.get(obj_id),
+                        (xmin + thickness, ymax - thickness),
                         fontFace=cv2.FONT_HERSHEY_SIMPLEX, fontScale=1,
                         color=CORAL_COLOR, thickness=2)
 
@@ -335,6 +2454,41 @@ def draw_pose(frame, keypoints, threshold=0.2, color=CORAL_COLOR,
     return points
 
 
+def draw_poses(frame, keypoints, threshold=0.2, color=CORAL_COLOR,
+               circle_radius=5, line_thickness=2):
+    """Draws the pose skeletons of one or many people on the image sent to the
+    display.
+
+    This draws the same as :func:`draw_pose()`, but draws all the skeleton
+    lines with one call, so it stays fast with many poses.
+
+    Args:
+      frame: The bitmap image to draw upon.
+      keypoints: A COCO-style pose keypoints tensor in shape [17, 3], such as
+        returned by :func:`PoseDetector.get_pose()`, or a stack of them in
+        shape [N, 17, 3] for N poses.
+      threshold (float): The minimum confidence score for drawn keypoints.
+      color (tuple): The BGR color (int,int,int) to use for the skeleton.
+      circle_radius (int): The radius size of each keypoint dot.
+      line_thickness (int): The pixel thickness for lines connecting the
+        keypoint dots.
+
+    Returns:
+      A tuple (points, valid) of arrays, the same as returned by
+      :func:`get_keypoint_array()`.
+    """
+    points, valid = get_keypoint_array(frame, keypoints, threshold)
+    for point in points[valid].tolist():
+        cv2.circle(frame, point, radius=circle_radius, color=color,
+                   thickness=-1)
+    # Draw the edges whose end points are both valid, as 2-point polylines.
+    lines = points[..., _KEYPOINT_EDGE_INDEX, :]
+    lines = lines[valid[..., _KEYPOINT_EDGE_INDEX].all(axis=-1)]
+    if len(lines):
+        cv2.polylines(frame, lines, False, color, thickness=line_thickness)
+    return points, valid
+
+
 def draw_label(frame, label, color=CORAL_COLOR):
     """
     Draws a text label on the image sent to the display.
@@ -373,15 +2527,779 @@ def draw_rect(frame, bbox, color=BLUE, thickness=5):
                   thickness)
 
 
+class FrameSource:
+    """Base class for the image sources that feed :func:`get_frames()`.
+
+    A source produces one image at a time from :func:`read()` until it runs
+    out of images. Subclasses override :func:`open()`, :func:`read()` and
+    :func:`release()`.
+    """
+
+    def open(self):
+        """Prepares the source to read frames."""
+
+    def read(self, out=None):
+        """Returns the next image frame, or None if the stream has ended.
+
+        Args:
+          out: An optional preallocated image array. Sources that can decode
+            directly into it do so and return ``out``; others ignore it and
+            return a new array.
+        """
+        raise NotImplementedError
+
+    def release(self):
+        """Releases all resources held by the source."""
+
+    def skip(self, count):
+        """Discards the next ``count`` frames.
+
+        Returns:
+          False if the stream ended while skipping, otherwise True.
+        """
+        for _ in range(count):
+            if self.read() is None:
+                return False
+        return True
+
+    def set_size(self, size):
+        """Requests a new image resolution, as an int tuple (x,y).
+
+        Sources that cannot change resolution ignore this.
+        """
+
+
+class _PacedSource(FrameSource):
+    """A source that can deliver frames either as fast as possible or paced at
+    a fixed frame rate."""
+
+    def __init__(self, realtime, fps):
+        self.realtime = realtime
+        self.fps = fps
+        self._next_time = None
+
+    def _pace(self):
+        if not self.realtime or not self.fps:
+            return
+        now = time.monotonic()
+        if self._next_time is None or self._next_time < now:
+            # First frame, or the consumer fell behind: don't try to catch up.
+            self._next_time = now
+        else:
+            time.sleep(self._next_time - now)
+        self._next_time += 1.0 / self.fps
+
+
+class CameraError(Exception):
+    """Exception raised when the camera cannot be started."""
+    pass
+
+
+class CameraSource(FrameSource):
+    """Reads frames from a camera with OpenCV.
+
+    The capture format is configured before the first frame is read, so the
+    camera driver starts streaming in the requested mode right away. The
+    first frame is kept and delivered as the first frame of the stream.
+
+    Args:
+      device_index (int): The Linux device ID for the camera.
+      size (tuple): The image resolution, as an int tuple (x,y).
+      fourcc (str): An optional four-character pixel format to request from
+        the camera, such as ``'MJPG'`` (compressed, which allows higher
+        resolutions and frame rates over USB) or ``'YUYV'`` (uncompressed).
+      buffer_size (int): An optional number of frames for the driver to
+        buffer. A value of 1 keeps the latency low when your code is slower
+        than the camera. Not every camera driver supports this.
+      attempts (int): The number of times to try opening the camera.
+      retry_delay (float): The seconds to wait after the first failed
+        attempt. The delay doubles after each further failure.
+
+    Attributes:
+      startup_time (float): The seconds it took to open the camera and read
+        the first frame.
+    """
+
+    def __init__(self, device_index=0, size=VIDEO_SIZE, fourcc=None,
+                 buffer_size=None, attempts=6, retry_delay=0.1):
+        self.device_index = device_index
+        self.size = size
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.startup_time = None
+        self._cap = None
+        self._first_frame = None
+        self._pending_size = None
+
+    def open(self):
+        """Starts the camera.
+
+        Raises:
+          CameraError: If the camera cannot be started after all attempts.
+        """
+        start = time.monotonic()
+        delay = self.retry_delay
+        for attempt in range(self.attempts):
+            if attempt > 0:
+                time.sleep(delay)
+                delay *= 2
+            cap = cv2.VideoCapture(self.device_index)
+            if cap.isOpened():
+                self._configure(cap)
+                success, frame = cap.read()
+                if success:
+                    break
+            cap.release()
+        else:
+            raise CameraError(
+                'Cannot initialize camera %s! Make sure the camera is '
+                'connected.' % self.device_index)
+
+        self.startup_time = time.monotonic() - start
+        self.size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                     int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        print("Camera started successfully (%dx%d in %.2f seconds)." % (
+            self.size[0], self.size[1], self.startup_time))
+        self._cap = cap
+        self._first_frame = frame
+
+    def _configure(self, cap):
+        if self.fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        width, height = self.size
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if self.buffer_size:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
+    def read(self, out=None):
+        if self._first_frame is not None:
+            frame, self._first_frame = self._first_frame, None
+            return frame
+        self._apply_pending_size()
+        success, frame = self._cap.read(out)
+        return frame if success else None
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self._first_frame = None
+
+    def skip(self, count):
+        self._first_frame = None
+        self._apply_pending_size()
+        for _ in range(count):
+            if not self._cap.grab():
+                return False
+        return True
+
+    def set_size(self, size):
+        # Applied by the thread that reads, which may not be the caller.
+        self._pending_size = size
+
+    def _apply_pending_size(self):
+        size = self._pending_size
+        if size is None:
+            return
+        self._pending_size = None
+        width, height = size
+        self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.size = size
+
+
+class VideoFileSource(_PacedSource):
+    """Reads frames from a video file, such as recorded camera footage.
+
+    Args:
+      path (str): Path to the video file.
+      realtime (bool): Whether to deliver frames at the video's frame rate (as
+        a camera would). If False, frames are delivered as fast as they can be
+        decoded.
+      fps (float): The frame rate to use when ``realtime`` is True. Defaults
+        to the frame rate stored in the video file.
+      loop (bool): Whether to restart from the beginning at the end of the
+        video (the stream otherwise ends with the video).
+    """
+
+    def __init__(self, path, realtime=False, fps=None, loop=False):
+        super().__init__(realtime, fps)
+        self.path = path
+        self.loop = loop
+        self._cap = None
+
+    def open(self):
+        self._cap = cv2.VideoCapture(self.path)
+        if not self._cap.isOpened():
+            raise ValueError('Cannot open video file: %s' % self.path)
+        if not self.fps:
+            self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def read(self, out=None):
+        success, frame = self._cap.read(out)
+        if not success and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self._cap.read(out)
+        if not success:
+            return None
+        self._pace()
+        return frame
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class ImageSource(_PacedSource):
+    """Reads frames from a set of image files.
+
+    Args:
+      path (str): A directory (all images inside are read), a glob pattern
+        such as ``'captures/*.png'``, or a single image file. Files are read in
+        sorted order and any file that is not a readable image is skipped.
+      realtime (bool): Whether to deliver images at the rate given by ``fps``.
+        If False, images are delivered as fast as they can be decoded.
+      fps (float): The frame rate to use when ``realtime`` is True.
+      loop (bool): Whether to restart from the first image after the last one.
+    """
+
+    def __init__(self, path, realtime=False, fps=30.0, loop=False):
+        super().__init__(realtime, fps)
+        self.path = path
+        self.loop = loop
+        self._files = []
+        self._index = 0
+
+    def open(self):
+        self._files = _expand_image_paths(self.path)
+        if not self._files:
+            raise ValueError('No image files found: %s' % self.path)
+        self._index = 0
+
+    def read(self, out=None):
+        attempts = len(self._files)
+        while attempts > 0:
+            if self._index >= len(self._files):
+                if not self.loop:
+                    return None
+                self._index = 0
+            filename = self._files[self._index]
+            self._index += 1
+            frame = cv2.imread(filename)
+            if frame is not None:
+                self._pace()
+                return frame
+            attempts -= 1
+        return None
+
+
+class SyntheticSource(_PacedSource):
+    """Generates artificial frames, for testing without a camera.
+
+    Args:
+      size (tuple): The image resolution, as an int tuple (x,y).
+      pattern (str): The image content. One of ``'gradient'`` (a gradient that
+        scrolls horizontally), ``'bars'`` (static color bars), ``'noise'``
+        (random pixels) or ``'black'``.
+      count (int): The number of frames to generate before the stream ends.
+        If None, frames are generated forever.
+      realtime (bool): Whether to deliver frames at the rate given by ``fps``.
+        If False, frames are delivered as fast as they can be generated.
+      fps (float): The frame rate to use when ``realtime`` is True.
+    """
+
+    _PATTERNS = ('gradient', 'bars', 'noise', 'black')
+
+    def __init__(self, size=VIDEO_SIZE, pattern='gradient', count=None,
+                 realtime=False, fps=30.0):
+        super().__init__(realtime, fps)
+        if pattern not in self._PATTERNS:
+            raise ValueError('pattern must be one of %s' % (self._PATTERNS,))
+        self.size = size
+        self.pattern = pattern
+        self.count = count
+        self._base = None
+        self._index = 0
+
+    def open(self):
+        width, height = self.size
+        if self.pattern == 'gradient':
+            ramp = np.linspace(0, 255, width, dtype=np.uint8)
+            self._base = np.repeat(np.tile(ramp, (height, 1))[:, :, None], 3,
+                                   axis=2)
+        elif self.pattern == 'bars':
+            colors = np.array([(255, 255, 255), (0, 255, 255), (255, 255, 0),
+                               (0, 255, 0), (255, 0, 255), (0, 0, 255),
+                               (255, 0, 0), (0, 0, 0)], dtype=np.uint8)
+            columns = np.arange(width) * len(colors) // width
+            self._base = np.tile(colors[columns], (height, 1, 1))
+        else:
+            self._base = np.zeros((height, width, 3), dtype=np.uint8)
+        self._index = 0
+
+    def read(self, out=None):
+        if self.count is not None and self._index >= self.count:
+            return None
+        if out is None or out.shape != self._base.shape:
+            out = np.empty_like(self._base)
+        if self.pattern == 'gradient':
+            shift = (self._index * 4) % self._base.shape[1]
+            out[:, shift:] = self._base[:, :out.shape[1] - shift]
+            out[:, :shift] = self._base[:, out.shape[1] - shift:]
+        elif self.pattern == 'noise':
+            out[:] = np.random.randint(0, 256, self._base.shape, dtype=np.uint8)
+        else:
+            np.copyto(out, self._base)
+        frame = out
+        self._index += 1
+        self._pace()
+        return frame
+
+
+def _expand_image_paths(path):
+    """Returns a sorted list of files for a directory, glob or file path."""
+    if os.path.isdir(path):
+        path = os.path.join(path, '*')
+    return sorted(f for f in glob.glob(path) if os.path.isfile(f))
+
+
+class FramePool:
+    """A fixed set of preallocated image buffers for :func:`get_frames()`.
+
+    When you pass a pool to :func:`get_frames()`, each frame is decoded
+    directly into a free buffer from the pool and mirrored in place, instead of
+    allocating new arrays for every frame. A frame you receive from
+    :func:`get_frames()` stays valid until the loop advances to the next frame.
+    If you want to keep a frame for longer (such as to hand it to another
+    thread), call :func:`hold()` on it and later call :func:`release()`.
+
+    If every buffer is in use when a new frame arrives, a temporary array is
+    allocated for that frame and :attr:`exhausted` is incremented, so a
+    non-zero count means you should increase ``count``.
+
+    Args:
+      size (tuple): The image resolution for the buffers, as an int tuple
+        (x,y). This must match the frames produced by the frame source.
+      count (int): The number of buffers to preallocate. Threaded capture needs
+        at least 3 (one being written, one waiting, and one in your code).
+      channels (int): The number of color channels per pixel.
+
+    Attributes:
+      exhausted (int): The number of frames that could not get a pooled buffer.
+    """
+
+    def __init__(self, size=VIDEO_SIZE, count=4, channels=3):
+        width, height = size
+        self._lock = threading.Lock()
+        self._free = [np.empty((height, width, channels), dtype=np.uint8)
+                      for _ in range(count)]
+        self._buffers = {id(buf): buf for buf in self._free}
+        self._refs = {}
+        self.exhausted = 0
+
+    def __len__(self):
+        return len(self._buffers)
+
+    @property
+    def available(self):
+        """The number of buffers that are not in use."""
+        with self._lock:
+            return len(self._free)
+
+    def acquire(self):
+        """Returns a free buffer, or a newly allocated array if none is free."""
+        with self._lock:
+            if self._free:
+                buf = self._free.pop()
+                self._refs[id(buf)] = 1
+                return buf
+            self.exhausted += 1
+            shape = next(iter(self._buffers.values())).shape
+        return np.empty(shape, dtype=np.uint8)
+
+    def hold(self, frame):
+        """Keeps a frame valid until a matching call to :func:`release()`."""
+        with self._lock:
+            if id(frame) in self._refs:
+                self._refs[id(frame)] += 1
+
+    def release(self, frame):
+        """Returns a frame's buffer to the pool once nothing else holds it.
+
+        Frames that don't belong to the pool are ignored.
+        """
+        with self._lock:
+            key = id(frame)
+            if key not in self._refs:
+                return
+            self._refs[key] -= 1
+            if self._refs[key] == 0:
+                del self._refs[key]
+                self._free.append(self._buffers[key])
+
+
+ControllerDecision = collections.namedtuple(
+    'ControllerDecision',
+    ['frame', 'action', 'skip', 'size', 'consumer_time', 'reason'])
+ControllerDecision.__doc__ = """A change made by :class:`AdaptiveController`.
+
+Attributes:
+  frame (int): The number of frames measured when the decision was made.
+  action (str): One of ``'skip_more'``, ``'skip_less'``, ``'size_down'`` or
+    ``'size_up'``.
+  skip (int): The number of frames now skipped between delivered frames.
+  size (tuple): The capture resolution now requested, as (x,y).
+  consumer_time (float): The average seconds your code spent per frame.
+  reason (str): A human-readable explanation, suitable for logging.
+"""
+
+
+class AdaptiveController:
+    """Adapts the frame rate and resolution of :func:`get_frames()` to the time
+    your code spends on each frame.
+
+    Pass an instance as the ``controller`` argument of :func:`get_frames()`.
+    It measures how long your loop body takes per frame (averaged over recent
+    frames) and compares that with the budget given by ``target_fps`` or
+    ``latency_budget``. When your code is over budget, the controller first
+    steps the capture resolution down through ``sizes``, then starts
+    skipping camera frames so that old frames don't pile up. When your code
+    is comfortably under budget, it undoes those steps in reverse order.
+
+    Every change is recorded as a :obj:`ControllerDecision` in
+    :attr:`decisions`.
+
+    Args:
+      target_fps (float): The number of frames per second you want to process.
+      latency_budget (float): The maximum seconds your code should spend on
+        each frame. Used instead of ``target_fps`` if given.
+      sizes (list): The capture resolutions to choose from, as (x,y) tuples,
+        ordered from largest to smallest. The stream starts at the first one.
+        Give a single size to only skip frames (as needed with a
+        :class:`FramePool`).
+      max_skip (int): The maximum number of frames to skip between delivered
+        frames.
+      window (int): The number of frames to measure after each change before
+        making another one.
+      headroom (float): The fraction of the budget your code must stay under
+        before the controller steps back up to more frames or a larger size.
+      history (int): The number of decisions kept in :attr:`decisions`.
+
+    Attributes:
+      skip (int): The number of frames currently skipped per delivered frame.
+      size (tuple): The capture resolution currently requested.
+      decisions: A ``collections.deque`` of the most recent
+        :obj:`ControllerDecision` objects, oldest first.
+    """
+
+    def __init__(self, target_fps=15.0, latency_budget=None,
+                 sizes=(VIDEO_SIZE, (480, 360), (320, 240)), max_skip=4,
+                 window=15, headroom=0.7, history=100):
+        if latency_budget is None:
+            if not target_fps or target_fps <= 0:
+                raise ValueError('target_fps must be positive')
+            latency_budget = 1.0 / target_fps
+        if latency_budget <= 0:
+            raise ValueError('latency_budget must be positive')
+        if not sizes:
+            raise ValueError('sizes must not be empty')
+        self.budget = latency_budget
+        self.sizes = [tuple(size) for size in sizes]
+        self.max_skip = max_skip
+        self.window = window
+        self.headroom = headroom
+        self.skip = 0
+        self.decisions = collections.deque(maxlen=history)
+        self._size_index = 0
+        self._frames = 0
+        self._total = 0.0
+        self._count = 0
+
+    @property
+    def size(self):
+        return self.sizes[self._size_index]
+
+    @property
+    def last_decision(self):
+        """The most recent :obj:`ControllerDecision`, or None."""
+        return self.decisions[-1] if self.decisions else None
+
+    def update(self, consumer_time):
+        """Records the time spent on one frame and adapts if needed.
+
+        This is called by :func:`get_frames()`; you only need to call it if you
+        drive your own capture loop.
+
+        Args:
+          consumer_time (float): The seconds spent processing the last frame.
+
+        Returns:
+          A :obj:`ControllerDecision` if the settings changed, otherwise None.
+        """
+        self._frames += 1
+        self._total += consumer_time
+        self._count += 1
+        if self._count < self.window:
+            return None
+
+        average = self._total / self._count
+        self._total = 0.0
+        self._count = 0
+
+        if average > self.budget:
+            if self._size_index < len(self.sizes) - 1:
+                self._size_index += 1
+                action = 'size_down'
+            elif self.skip < self.max_skip:
+                self.skip += 1
+                action = 'skip_more'
+            else:
+                return None
+            reason = '%.1f ms per frame is over the %.1f ms budget' % (
+                average * 1000, self.budget * 1000)
+        elif average < self.budget * self.headroom:
+            if self.skip > 0:
+                self.skip -= 1
+                action = 'skip_less'
+            elif self._size_index > 0:
+                self._size_index -= 1
+                action = 'size_up'
+            else:
+                return None
+            reason = '%.1f ms per frame is under %d%% of the %.1f ms budget' % (
+                average * 1000, self.headroom * 100, self.budget * 1000)
+        else:
+            return None
+
+        decision = ControllerDecision(self._frames, action, self.skip,
+                                      self.size, average, reason)
+        self.decisions.append(decision)
+        return decision
+
+
+class DisplayRenderer:
+    """Shows frames in a desktop window from a background thread.
+
+    Normally, :func:`get_frames()` draws each frame in the window after your
+    code is done with it, so the display time adds to every loop iteration.
+    If you instead pass a renderer as the ``renderer`` argument, frames are
+    handed to this renderer's thread, which always shows the newest frame
+    (skipping any it didn't get to) and reports key presses back.
+
+    Args:
+      title (str): A title for the display window.
+      fps (float): The maximum window refresh rate. If None, the window is
+        refreshed for every frame the thread gets to.
+      scale (float): An optional factor to resize frames by before display,
+        such as 0.5 to show them at half size (which is cheaper to draw).
+    """
+
+    def __init__(self, title='Camera', fps=None, scale=None):
+        self.title = title
+        self.fps = fps
+        self.scale = scale
+        self._cond = threading.Condition()
+        self._frame = None
+        self._release = None
+        self._running = True
+        self._keys = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def show(self, frame, release=None):
+        """Queues a frame to display, replacing any frame not yet shown.
+
+        Args:
+          frame: The bitmap image to show. Don't modify it after this call.
+          release: An optional function that is called with the frame once the
+            renderer no longer needs it.
+        """
+        with self._cond:
+            if self._frame is not None and self._release:
+                self._release(self._frame)
+            self._frame = frame
+            self._release = release
+            self._cond.notify()
+
+    def get_key(self):
+        """Returns the oldest key pressed in the window, or -1 if none."""
+        try:
+            return self._keys.get_nowait()
+        except queue.Empty:
+            return -1
+
+    def close(self):
+        """Stops the render thread and closes the window."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        interval = 1.0 / self.fps if self.fps else 0.0
+        try:
+            while True:
+                with self._cond:
+                    # Wake up regularly to keep the window responsive.
+                    self._cond.wait_for(
+                        lambda: self._frame is not None or not self._running,
+                        timeout=0.03)
+                    if not self._running:
+                        break
+                    frame, release = self._frame, self._release
+                    self._frame = self._release = None
+
+                start = time.monotonic()
+                if frame is not None:
+                    image = frame
+                    if self.scale:
+                        image = cv2.resize(frame, None, fx=self.scale,
+                                           fy=self.scale,
+                                           interpolation=cv2.INTER_AREA)
+                    cv2.imshow(self.title, image)
+                    if release:
+                        release(frame)
+
+                remaining = interval - (time.monotonic() - start)
+                key = cv2.waitKey(max(1, int(remaining * 1000)))
+                if key != -1:
+                    self._keys.put(key)
+        finally:
+            with self._cond:
+                if self._frame is not None and self._release:
+                    self._release(self._frame)
+                self._frame = None
+            cv2.destroyWindow(self.title)
+
+
+class CaptureStats:
+    """Frame counters collected by :func:`get_frames()`.
+
+    Pass an instance as the ``stats`` argument and read the attributes at any
+    time (such as from inside your frame loop).
+
+    Attributes:
+      frames_captured (int): The number of frames read from the camera.
+      frames_delivered (int): The number of frames yielded to your code.
+      frames_dropped (int): The number of frames that were replaced by a newer
+        frame before your code received them (only in threaded mode).
+      frames_skipped (int): The number of frames discarded on purpose by an
+        :class:`AdaptiveController`.
+      startup_time (float): The seconds from starting the frame source until
+        the first frame was read.
+    """
+
+    def __init__(self):
+        self.startup_time = None
+        self.frames_captured = 0
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self.frames_skipped = 0
+
+
+class _LatestFrameReader:
+    """Reads frames on a background thread and keeps only the newest one.
+
+    If ``read`` raises an exception, the stream ends and the exception is
+    raised again by :func:`get()` in the thread that consumes the frames.
+
+    Args:
+      read: A function that returns the next frame, or None when the stream
+        has ended.
+      stats: A :class:`CaptureStats` to update.
+      release: An optional function called with each frame that is dropped.
+    """
+
+    def __init__(self, read, stats, release=None):
+        self._read = read
+        self._stats = stats
+        self._release = release
+        self._cond = threading.Condition()
+        self._frame = None
+        self._time = None
+        self._fresh = False
+        self._running = True
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while self._running:
+                frame = self._read()
+                timestamp = time.monotonic()
+                if frame is None:
+                    return
+                with self._cond:
+                    self._stats.frames_captured += 1
+                    if self._fresh:
+                        self._stats.frames_dropped += 1
+                        if self._release:
+                            self._release(self._frame)
+                    self._frame = frame
+                    self._time = timestamp
+                    self._fresh = True
+                    self._cond.notify_all()
+        except Exception as e:
+            # Handed to the consumer, because nothing sees this thread fail.
+            self._error = e
+        finally:
+            with self._cond:
+                self._running = False
+                self._cond.notify_all()
+
+    def get(self):
+        """Blocks until a frame newer than the last one returned is ready.
+
+        Returns None once the stream has ended.
+
+        Raises:
+          Exception: Whatever the read function raised, once the frames read
+            before the error have been returned.
+        """
+        return self.get_timed()[0]
+
+    def get_timed(self):
+        """Like :func:`get()`, but returns a tuple (frame, timestamp) with the
+        ``time.monotonic()`` value from when the frame was read."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._fresh or not self._running)
+            if not self._fresh:
+                if self._error:
+                    raise self._error
+                return None, None
+            self._fresh = False
+            return self._frame, self._time
+
+    def drop(self, frame):
+        """Counts a frame returned by :func:`get()` as dropped and releases
+        it."""
+        with self._cond:
+            self._stats.frames_dropped += 1
+            if self._release:
+                self._release(frame)
+
+    def stop(self):
+        """Stops the capture thread and waits for it to finish."""
+        self._running = False
+        self._thread.join()
+
+
 def get_frames(title='Camera', size=VIDEO_SIZE, handle_key=None,
                capture_device_index=0, mirror=True, display=True,
-               return_key=False):
+               return_key=False, threaded=False, stats=None, source=None,
+               pool=None, stop=None, controller=None, renderer=None):
     """
-    Gets a stream of image frames from the camera.
+    Gets a stream of image frames from the camera (or another frame source).
 
     Args:
       title (str): A title for the display window.
       size (tuple): The image resolution for all frames, as an int tuple (x,y).
+        This has no effect if you specify a ``source``.
       handle_key: A callback function that accepts arguments (key, frame) for
         a key event and the image frame from the moment the key was pressed.
         This has no effect if display is False.
@@ -389,15 +3307,61 @@ def get_frames(title='Camera', size=VIDEO_SIZE, handle_key=None,
       mirror (bool): Whether to flip the images horizontally (set True for a
         selfie view).
       display (bool): Whether to show the camera images in a desktop window
-        (set False if you don't use a desktop).
+        (set False if you don't use a desktop). When False, no OpenCV window
+        functions are called at all, so no GUI backend or display is needed.
       return_key (bool): Whether to also return any key presses. If True, the
         function returns a tuple with (frame, key) instead of just the frame.
+        The key is always -1 if display is False.
+      threaded (bool): Whether to capture frames on a background thread. The
+        camera then keeps reading while your code processes a frame, and each
+        iteration receives the newest frame available; older frames that your
+        code did not get to are dropped (and counted in ``stats``). If the
+        source fails, its error is raised in your loop, as without threading.
+      stats (CaptureStats): An optional :class:`CaptureStats` object that is
+        updated with frame counters while the stream runs.
+      source (FrameSource): Where to get the frames from, such as a
+        :class:`VideoFileSource`, :class:`ImageSource` or
+        :class:`SyntheticSource`. Defaults to a :class:`CameraSource` for
+        ``capture_device_index`` at the given ``size``. The stream ends when
+        the source runs out of frames.
+      pool (FramePool): An optional :class:`FramePool` to decode frames into,
+        which avoids allocating new image arrays for every frame. Each frame
+        is returned to the pool when the loop advances, unless you call
+        ``pool.hold(frame)``. A pool's buffers have a fixed size, so it
+        can't be used with a ``controller`` that changes the resolution.
+      stop: An optional way to end the stream without a key press (such as
+        when running headless). Either a ``threading.Event`` (the stream ends
+        once it is set) or a function that takes no arguments and returns True
+        to end the stream. It is checked before reading each frame.
+      controller (AdaptiveController): An optional
+        :class:`AdaptiveController` that measures how long your code takes per
+        frame and adjusts frame skipping and the capture resolution to match.
+        Frame skipping has no effect in threaded mode (which already drops
+        old frames), and only a :class:`CameraSource` changes resolution.
+      renderer (DisplayRenderer): An optional :class:`DisplayRenderer` that
+        shows the frames on its own thread instead of in the frame loop (and
+        provides the key presses). This implies ``display=True``, and the
+        renderer is closed when the stream ends.
 
     Returns:
       An iterator that yields each image frame from the default camera. Or a
       tuple if ``return_key`` is True.
+
+    Raises:
+      CameraError: If the camera cannot be started.
+      ValueError: If both ``pool`` and a ``controller`` with more than one
+        size are given.
     """
-    width, height = size
+    if pool and controller and len(set(controller.sizes)) > 1:
+        raise ValueError('A FramePool cannot be used with an '
+                         'AdaptiveController that changes the resolution; '
+                         'give the controller a single size')
+    if source is None:
+        source = CameraSource(capture_device_index, size)
+    if stats is None:
+        stats = CaptureStats()
+    if renderer:
+        display = True
 
     if display and not handle_key:
         print("Press Q to quit")
@@ -407,45 +3371,180 @@ def get_frames(title='Camera', size=VIDEO_SIZE, handle_key=None,
                 return False
             return True
 
-    attempts = 5
-    while True:
-        cap = cv2.VideoCapture(capture_device_index)
-        success, _ = cap.read()
-        if success:
-            print("Camera started successfully.")
-            break
+    open_time = time.monotonic()
+    source.open()
 
-        if attempts == 0:
-            print(
-                "Cannot initialize camera!\nMake sure the camera is connected.",
-                file=sys.stderr)
-            sys.exit(1)
+    def read_frame():
+        if not pool:
+            frame = source.read()
+            if frame is not None and mirror:
+                frame = cv2.flip(frame, 1)
+            return frame
+
+        buf = pool.acquire()
+        frame = source.read(buf)
+        if frame is not buf:
+            # The source could not decode into the buffer.
+            pool.release(buf)
+        if frame is not None and mirror:
+            cv2.flip(frame, 1, dst=frame)
+        return frame
+
+    if isinstance(stop, threading.Event):
+        stop = stop.is_set
 
-        cap.release()
-        attempts -= 1
+    if controller:
+        source.set_size(controller.size)
 
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    release = pool.release if pool else None
+    reader = None
+    if threaded:
+        reader = _LatestFrameReader(read_frame, stats, release)
 
     try:
         while True:
-            key = cv2.waitKey(1)
-            success, frame = cap.read()
-            if mirror:
+            if stop and stop():
+                break
+            if renderer:
+                key = renderer.get_key()
+            elif display:
+                key = cv2.waitKey(1)
+            else:
+                key = -1
+            if reader:
+                frame = reader.get()
+            else:
+                if controller and controller.skip:
+                    if not source.skip(controller.skip):
+                        break
+                    stats.frames_skipped += controller.skip
+                frame = read_frame()
+                if frame is not None:
+                    stats.frames_captured += 1
+            if frame is None:
+                break
+
+            if stats.startup_time is None:
+                stats.startup_time = time.monotonic() - open_time
+            stats.frames_delivered += 1
+            start_time = time.monotonic()
+            if return_key:
+                yield (frame, key)
+            else:
+                yield frame
+            if controller:
+                decision = controller.update(time.monotonic() - start_time)
+                if decision and decision.action.startswith('size'):
+                    source.set_size(decision.size)
+            if renderer:
+                if pool:
+                    pool.hold(frame)
+                renderer.show(frame, release)
+            elif display:
+                cv2.imshow(title, frame)
+
+            keep_going = key == -1 or handle_key(key, frame)
+            if pool:
+                pool.release(frame)
+            if not keep_going:
+                break
+    finally:
+        if reader:
+            reader.stop()
+        source.release()
+        if renderer:
+            renderer.close()
+        elif display:
+            cv2.destroyAllWindows()
+
+
+def get_synced_frames(sources, tolerance=0.02, mirror=True, stop=None,
+                      stats=None, return_timestamps=False):
+    """
+    Gets a stream of time-aligned frames from several cameras at once.
+
+    Each source is read on its own thread. Every iteration yields one frame
+    per source, where all frames were captured within ``tolerance`` seconds of
+    each other. If a camera falls behind, the other cameras' older frames
+    are dropped until they line up again. This allows a single process (and a
+    single model) to handle all the cameras.
+
+    This does not display the frames; use :class:`DisplayRenderer` if you want
+    to show them. If reading from any source fails, all of the sources are
+    stopped and the error is raised in your loop.
+
+    Args:
+      sources (list): The frame sources, as :class:`FrameSource` objects or
+        camera device IDs (which are opened as a :class:`CameraSource` at
+        :data:`VIDEO_SIZE`).
+      tolerance (float): The maximum difference in seconds between the capture
+        times of the frames that are yielded together.
+      mirror (bool): Whether to flip the images horizontally.
+      stop: An optional ``threading.Event`` or function to end the stream, as
+        described in :func:`get_frames()`.
+      stats (list): An optional list of :class:`CaptureStats` objects, one for
+        each source, to update while the stream runs. Frames dropped to keep
+        the sources aligned are counted as ``frames_dropped``.
+      return_timestamps (bool): Whether to also return the capture times. If
+        True, each iteration yields a tuple (frames, timestamps) with
+        ``time.monotonic()`` values.
+
+    Returns:
+      An iterator that yields a tuple of frames (in the order of ``sources``),
+      until any of the sources runs out of frames.
+
+    Raises:
+      CameraError: If a camera cannot be started.
+    """
+    sources = [CameraSource(s) if isinstance(s, int) else s for s in sources]
+    if stats is None:
+        stats = [CaptureStats() for _ in sources]
+    if len(stats) != len(sources):
+        raise ValueError('stats must have one item for each source')
+    if isinstance(stop, threading.Event):
+        stop = stop.is_set
+
+    def reader_for(source):
+        def read_frame():
+            frame = source.read()
+            if frame is not None and mirror:
                 frame = cv2.flip(frame, 1)
-            if success:
-                if return_key:
-                    yield (frame, key)
-                else:
-                    yield frame
-                if display:
-                    cv2.imshow(title, frame)
-
-            if key != -1 and not handle_key(key, frame):
+            return frame
+        return read_frame
+
+    readers = []
+    try:
+        for source in sources:
+            source.open()
+        for source, source_stats in zip(sources, stats):
+            readers.append(_LatestFrameReader(reader_for(source), source_stats))
+
+        while not (stop and stop()):
+            frames, times = zip(*[reader.get_timed() for reader in readers])
+            frames, times = list(frames), list(times)
+            while None not in times:
+                newest = max(times)
+                stale = [i for i, t in enumerate(times)
+                         if newest - t > tolerance]
+                if not stale:
+                    break
+                for i in stale:
+                    readers[i].drop(frames[i])
+                    frames[i], times[i] = readers[i].get_timed()
+            if None in times:
                 break
+
+            for source_stats in stats:
+                source_stats.frames_delivered += 1
+            if return_timestamps:
+                yield tuple(frames), tuple(times)
+            else:
+                yield tuple(frames)
     finally:
-        cap.release()
-        cv2.destroyAllWindows()
+        for reader in readers:
+            reader.stop()
+        for source in sources:
+            source.release()
 
 
 def save_frame(filename, frame):
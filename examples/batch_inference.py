@@ -0,0 +1,136 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Classifies (or detects objects in) a large set of image files, such as
+archived camera captures, and writes the results as CSV or NDJSON.
+
+To classify every image in a directory with our MobileNet model and print
+the top result for each one as CSV:
+
+    python3 batch_inference.py ~/Pictures
+
+Or detect objects in all PNG files and save the results as NDJSON:
+
+    python3 batch_inference.py --task detect -f ndjson -o results.ndjson \
+        'captures/*.png'
+
+The processing speed (images per second) is printed when done.
+
+For information about the script options, run:
+
+    python3 batch_inference.py --help
+
+For more instructions, see g.co/aiy/maker
+"""
+
+import argparse
+import csv
+import json
+import sys
+from pycoral.utils.dataset import read_label_file
+from aiymakerkit import vision
+from aiymakerkit.utils import read_labels_from_metadata
+import models
+
+
+def classify_rows(classifier, labels, args, stats):
+    """Yields one result dictionary per classification."""
+    for filename, classes in classifier.get_classes_batch(
+            args.inputs, top_k=args.top_k, threshold=args.threshold,
+            processes=args.processes, stats=stats):
+        for rank, c in enumerate(classes):
+            yield {'file': filename, 'rank': rank, 'id': int(c.id),
+                   'label': labels.get(c.id, 'n/a'), 'score': float(c.score)}
+
+
+def detect_rows(detector, labels, args, stats):
+    """Yields one result dictionary per detected object."""
+    for filename, objects in detector.get_objects_batch(
+            args.inputs, threshold=args.threshold, processes=args.processes,
+            stats=stats):
+        for obj in objects:
+            bbox = obj.bbox
+            yield {'file': filename, 'id': int(obj.id),
+                   'label': labels.get(obj.id, 'n/a'),
+                   'score': float(obj.score), 'xmin': bbox.xmin,
+                   'ymin': bbox.ymin, 'xmax': bbox.xmax, 'ymax': bbox.ymax}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('inputs', nargs='+',
+                        help='Image files, directories or glob patterns.')
+    parser.add_argument('--task', choices=('classify', 'detect'),
+                        default='classify', help='The type of model to run.')
+    parser.add_argument('-m', '--model', default=None,
+                        help='File path of .tflite file. Default is ' \
+                        'models.CLASSIFICATION_MODEL or ' \
+                        'models.OBJECT_DETECTION_MODEL, depending on the task.')
+    parser.add_argument('-l', '--labels', default=None,
+                        help='File path of labels file. If not specified, ' \
+                        'we get the labels from the model metadata.')
+    parser.add_argument('-k', '--top_k', type=int, default=1,
+                        help='Number of classes to report per image.')
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help='Minimum score for reported results.')
+    parser.add_argument('-f', '--format', choices=('csv', 'ndjson'),
+                        default='csv', help='Output format.')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Output file. If not specified, print results.')
+    parser.add_argument('-p', '--processes', type=int, default=None,
+                        help='Number of image decoding processes. Default ' \
+                        'is the number of CPUs.')
+    args = parser.parse_args()
+
+    if args.task == 'classify':
+        model = args.model or models.CLASSIFICATION_MODEL
+        engine, get_rows = vision.Classifier(model), classify_rows
+        fields = ['file', 'rank', 'id', 'label', 'score']
+    else:
+        model = args.model or models.OBJECT_DETECTION_MODEL
+        engine, get_rows = vision.Detector(model), detect_rows
+        fields = ['file', 'id', 'label', 'score', 'xmin', 'ymin', 'xmax',
+                  'ymax']
+    if args.labels is not None:
+        labels = read_label_file(args.labels)
+    else:
+        labels = read_labels_from_metadata(model)
+
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        if args.format == 'csv':
+            writer = csv.DictWriter(out, fieldnames=fields)
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            def write(row):
+                out.write(json.dumps(row) + '\n')
+
+        stats = vision.BatchStats()
+        for row in get_rows(engine, labels, args, stats):
+            write(row)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print('Processed %d images in %.1f seconds (%.1f images/sec), ' \
+          '%d unreadable files.' % (stats.images, stats.elapsed,
+                                    stats.images_per_second, stats.failed),
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -47,4 +47,5 @@ for frame in vision.get_frames():
     vision.draw_pose(frame, pose)
     # Classify different body poses
     label_id = pose_classifier.get_class(pose)
-    vision.draw_label(frame, labels.get(label_id))
+    if label_id is not None:
+        vision.draw_label(frame, labels.get(label_id))
@@ -17,10 +17,14 @@ This is an example project that detects when a person walks into a specific
 region of the camera view.
 
 As is, this code simply changes the color of the bounding-box drawn around the
-person when they enter the fenced area. The code also makes some arbitrary
-guesses about what proportion of the person's body must be in the fencee area
-to be considered inside it. So you probably need to adjust these parameters to
-suit your situation.
+person when they enter the fenced area, and prints a message when each person
+enters or leaves it. People are tracked from frame to frame, so the object
+detection model runs only on every other frame, and the tracker predicts where
+people are in between. And while nothing in the scene moves, the model doesn't
+run at all. The code also makes some arbitrary guesses about what
+proportion of the person's body must be in the fencee area to be considered
+inside it. So you probably need to adjust these parameters to suit your
+situation.
 
 The TensorFlow model required is already downloaded if you flashed the
 AIY Maker Kit system image for Raspberry Pi. Otherwise, you must download it
@@ -53,6 +57,11 @@ OBJECT_DETECTION_MODEL = path('ssd_mobilenet_v2_coco_quant_postprocess_edgetpu.t
 detector = vision.Detector(OBJECT_DETECTION_MODEL)
 labels = utils.read_labels_from_metadata(OBJECT_DETECTION_MODEL)
 
+# Track objects with at least 50% confidence, detecting every other frame
+tracker = vision.ObjectTracker(detector, detect_every=2, threshold=0.5)
+# Skip tracking while the scene is still (but check at least every 100 frames)
+motion = vision.MotionDetector(refresh_every=100)
+
 # Define the protected fence region
 width, height = vision.VIDEO_SIZE
 xmin = 0
@@ -61,31 +70,38 @@ xmax = int(width * 0.5)
 ymax = int(height * 0.5)
 fence_box = BBox(xmin, ymin, xmax, ymax)
 
+# Someone is in the fence if more than 30% of the person is in the fence,
+# OR if more than 50% of the fence is obscured by the person
+# (such as if the person is very close to the camera).
+# Wait 2 frames (detect_every * the tracker's max_age) before reporting that
+# someone left, so one missed detection doesn't count as leaving and entering
+zones = vision.ZoneMonitor({'fence': fence_box}, membership='overlap',
+                           min_overlap=0.3, min_coverage=0.5, exit_delay=2)
+
 # Run a loop to get images and process them in real-time
-for frame in vision.get_frames():
+# (capture runs on a separate thread, so we always check the newest frame)
+for frame in vision.get_frames(threaded=True):
     # Draw the fenced region
     vision.draw_rect(frame, fence_box, color=BLUE, thickness=3)
 
-    # Detect only objects with at least 50% confidence
-    objects = detector.get_objects(frame, threshold=0.5)
-
-    # Review all detected objects and check for
-    # objects that look like a person (ignore the rest)
-    for obj in objects:
-        label = labels.get(obj.id)
-        if 'person' in label:
-            # Get size of the person, the fence, and the overlap between them
-            person_area = obj.bbox.area
-            fence_area = fence_box.area
-            overlap_area = BBox.intersect(obj.bbox, fence_box).area
-
-            # Check if more than 30% of the person is in the fence,
-            # OR if more than 50% of the fence is obscured by the object
-            # (such as if the person is very close to the camera)
-            if (overlap_area / person_area) > 0.3 or (
-                    overlap_area / fence_area) > 0.5:
-                # They are in the fence; draw their box red
-                vision.draw_rect(frame, obj.bbox, color=RED)
-            else:
-                # They are outside the fence; draw them green
-                vision.draw_rect(frame, obj.bbox, color=GREEN)
+    # Get the tracked objects (each one keeps its track_id between frames),
+    # or the previous objects if nothing moved
+    objects = motion.run(frame, tracker.get_objects)
+
+    # Keep only the objects that look like a person (ignore the rest)
+    people = [obj for obj in objects if 'person' in labels.get(obj.id, '')]
+
+    # Check all people against the fence, and report who entered or left
+    for event in zones.update(people):
+        print('Person %d %s the fence' % (
+            event.track_id, 'entered' if event.kind == 'enter' else 'left'))
+
+    for person, inside in zip(people, zones.inside[:, 0]):
+        if inside:
+            # They are in the fence; draw their box red
+            vision.draw_rect(frame, person.bbox, color=RED)
+        else:
+            # They are outside the fence; draw them green
+            vision.draw_rect(frame, person.bbox, color=GREEN)
+
+print('Skipped %.0f%% of frames without motion' % (motion.skip_ratio * 100))
@@ -41,22 +41,6 @@ def path(name):
     return os.path.join(root, name)
 
 
-def box_is_in_box(bbox_a, bbox_b):
-    """
-    Checks if bounding-box "a" is fully inside bounding-box "b".
-
-    Args:
-      bbox_a: The ``BBox`` object you want to identify as "in" or "out".
-      bbox_b: The ``BBox`` object that might contain bbox_a.
-    Returns:
-      True if "a" is inside "b"; false otherwise.
-    """
-    if (bbox_a.xmin > bbox_b.xmin and bbox_a.xmax < bbox_b.xmax) and (
-            bbox_a.ymin > bbox_b.ymin and bbox_a.ymax < bbox_b.ymax):
-        return True
-    return False
-
-
 # Load the TensorFlow Lite model (compiled for the Edge TPU)
 FACE_DETECTION_MODEL = path('ssd_mobilenet_v2_face_quant_postprocess_edgetpu.tflite')
 detector = vision.Detector(FACE_DETECTION_MODEL)
@@ -68,20 +52,18 @@ xmax = int(width - (width * 0.25))
 ymin = int(height * 0.2)
 ymax = int(height - (height * 0.2))
 camera_bbox = BBox(xmin, ymin, xmax, ymax)
+zone = vision.ZoneMonitor([camera_bbox])
 
 # Run a loop to get images and process them in real-time
 for frame in vision.get_frames():
     faces = detector.get_objects(frame)
 
-    # Count the number of faces in the detection zone
-    faces_in_box = 0
-    for face in faces:
-        if box_is_in_box(face.bbox, camera_bbox):
-            faces_in_box += 1
+    # Check which faces are entirely in the detection zone
+    faces_in_box = zone.measure(faces).contained[:, 0]
 
     # If everyone's in the box and some time has passed since last photo
-    if faces and faces_in_box == len(
-            faces) and time.monotonic() - snap_time > DELAY_SECS:
+    if faces and faces_in_box.all() and (
+            time.monotonic() - snap_time > DELAY_SECS):
         timestamp = datetime.now()
         filename = "SMART_CAM_" + timestamp.strftime("%Y%m%d_%H%M%S") + '.png'
         filename = os.path.join(PICTURE_DIR, filename)
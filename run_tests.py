@@ -55,12 +55,16 @@ def main():
     print('--- Testing camera ---')
     TIME_LIMIT = 4
     start = time.monotonic()
-    for frame in vision.get_frames():
-        elapsed = int(time.monotonic() - start)
-        print('Closing video in...', TIME_LIMIT - elapsed, end='\r')
-        if (elapsed >= TIME_LIMIT):
-            print('\nCamera is working.\n')
-            break
+    try:
+        for frame in vision.get_frames():
+            elapsed = int(time.monotonic() - start)
+            print('Closing video in...', TIME_LIMIT - elapsed, end='\r')
+            if (elapsed >= TIME_LIMIT):
+                print('\nCamera is working.\n')
+                break
+    except vision.CameraError as e:
+        print(e)
+        return 1
 
     print('--- Testing USB Accelerator ---')
     if not usb_accelerator_connected():
@@ -0,0 +1,106 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measures how long it takes to import each aiymakerkit module, and fails if an
+import loads a heavy dependency (such as OpenCV or TensorFlow Lite) or takes
+longer than the allowed time. Run it after changing module imports to catch
+startup regressions:
+
+    python3 scripts/import_time.py
+
+Each import runs in a new Python process, several times, and the median time
+is reported.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = ['aiymakerkit.utils', 'aiymakerkit.vision', 'aiymakerkit.audio']
+
+# Dependencies that must load only when first used.
+HEAVY_MODULES = ['cv2', 'tflite_runtime.interpreter',
+                 'pycoral.adapters.common', 'pycoral.adapters.classify',
+                 'pycoral.adapters.detect', 'pycoral.utils.edgetpu',
+                 'pycoral.utils.dataset', 'pyaudio', 'tflite_support.metadata']
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Prints the import time in seconds, then any heavy modules that were loaded.
+PROBE = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(' '.join(m for m in {heavy!r} if m in sys.modules))
+'''
+
+
+def time_import(module):
+    """Returns a tuple (seconds, loaded heavy modules) for one import.
+
+    Raises:
+      RuntimeError: If the import fails.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [ROOT_DIR] + [p for p in env.get('PYTHONPATH', '').split(os.pathsep)
+                      if p])
+    probe = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-c', probe], env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    lines = result.stdout.splitlines()
+    return float(lines[0]), lines[1].split() if len(lines) > 1 else []
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='Number of times to import each module.')
+    parser.add_argument('--max_ms', type=float, default=1000,
+                        help='Maximum median milliseconds for each import.')
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        times, heavy = [], set()
+        try:
+            for _ in range(args.repeat):
+                seconds, loaded = time_import(module)
+                times.append(seconds * 1000)
+                heavy.update(loaded)
+        except RuntimeError as e:
+            print('%-20s   FAIL: %s' % (module, e))
+            failed = True
+            continue
+        median = statistics.median(times)
+        print('%-20s %8.1f ms' % (module, median))
+        if heavy:
+            print('  FAIL: imported %s at import time' %
+                  ', '.join(sorted(heavy)))
+            failed = True
+        if median > args.max_ms:
+            print('  FAIL: slower than %.0f ms' % args.max_ms)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Checks that an error from a frame source reaches the code that iterates over
+the frames (instead of stopping the capture thread and hanging the loop),
+with and without threaded capture and for synchronized cameras:
+
+    python3 scripts/test_capture_errors.py
+
+No camera is needed.
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from aiymakerkit import vision
+
+# Seconds to wait for a stream to end before it counts as hung.
+TIMEOUT = 10
+
+
+class FailingSource(vision.SyntheticSource):
+    """A synthetic source whose read fails after a few frames."""
+
+    def __init__(self, fail_after=3):
+        super().__init__()
+        self.fail_after = fail_after
+        self.reads = 0
+
+    def read(self, out=None):
+        self.reads += 1
+        if self.reads > self.fail_after:
+            raise IOError('camera disconnected')
+        return super().read(out)
+
+
+def consume(stream):
+    """Returns the exception that ends the stream, or None if it ends
+    normally or hangs."""
+    result = {}
+
+    def run():
+        try:
+            for _ in stream:
+                pass
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(TIMEOUT)
+    if thread.is_alive():
+        raise RuntimeError('hung for %d seconds' % TIMEOUT)
+    return result.get('error')
+
+
+def main():
+    checks = [
+        ('get_frames', lambda: vision.get_frames(
+            source=FailingSource(), display=False, mirror=False)),
+        ('get_frames threaded', lambda: vision.get_frames(
+            source=FailingSource(), display=False, mirror=False,
+            threaded=True)),
+        ('get_synced_frames', lambda: vision.get_synced_frames(
+            [vision.SyntheticSource(), FailingSource()], mirror=False)),
+    ]
+    failed = False
+    for name, make_stream in checks:
+        try:
+            error = consume(make_stream())
+        except RuntimeError as e:
+            print('%-20s FAIL: %s' % (name, e))
+            failed = True
+            continue
+        if isinstance(error, IOError):
+            print('%-20s OK' % name)
+        else:
+            print('%-20s FAIL: expected IOError, got %r' % (name, error))
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()